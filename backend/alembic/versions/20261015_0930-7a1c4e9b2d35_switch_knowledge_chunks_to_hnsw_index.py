@@ -0,0 +1,64 @@
+"""switch knowledge_chunks to hnsw index
+
+Revision ID: 7a1c4e9b2d35
+Revises: fe3d1f3daef2
+Create Date: 2026-10-15 09:30:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.base_config import base_settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1c4e9b2d35'
+down_revision: Union[str, Sequence[str], None] = 'fe3d1f3daef2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+HNSW_INDEX_NAME = "knowledge_chunks_hnsw"
+# Built lazily by app.memory.vectorstore before this migration existed
+IVFFLAT_INDEX_NAME = "knowledge_chunks_ivfflat"
+
+
+def _drop_if_invalid(index_name: str) -> None:
+    """Drop a leftover INVALID index from an interrupted concurrent build."""
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name},
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        _drop_if_invalid(HNSW_INDEX_NAME)
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {HNSW_INDEX_NAME} "
+            "ON knowledge_chunks USING hnsw (embedding vector_cosine_ops) "
+            f"WITH (m = {int(base_settings.VECTOR_INDEX_HNSW_M)}, "
+            f"ef_construction = {int(base_settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION)})"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {IVFFLAT_INDEX_NAME}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        _drop_if_invalid(IVFFLAT_INDEX_NAME)
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {IVFFLAT_INDEX_NAME} "
+            "ON knowledge_chunks USING ivfflat (embedding vector_cosine_ops) "
+            "WITH (lists = 100)"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {HNSW_INDEX_NAME}")
@@ -0,0 +1,49 @@
+"""add document blobs
+
+Revision ID: d2b6e8f41a73
+Revises: c4f8a2e61b97
+Create Date: 2026-10-15 14:00:12.480311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b6e8f41a73'
+down_revision: Union[str, Sequence[str], None] = 'c4f8a2e61b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'document_blobs',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('storage_key', sa.String(length=255), nullable=False),
+        sa.Column('file_size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash'),
+        sa.UniqueConstraint('storage_key'),
+    )
+    op.add_column('knowledge_modules', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_knowledge_modules_content_hash'), 'knowledge_modules', ['content_hash'], unique=False)
+    op.create_foreign_key(
+        'knowledge_modules_content_hash_fkey',
+        'knowledge_modules',
+        'document_blobs',
+        ['content_hash'],
+        ['content_hash'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('knowledge_modules_content_hash_fkey', 'knowledge_modules', type_='foreignkey')
+    op.drop_index(op.f('ix_knowledge_modules_content_hash'), table_name='knowledge_modules')
+    op.drop_column('knowledge_modules', 'content_hash')
+    op.drop_table('document_blobs')
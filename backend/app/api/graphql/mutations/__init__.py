@@ -12,3 +12,6 @@ class Mutation:
     add_knowledge_module = knowledge.add_knowledge_module
     update_knowledge_module = knowledge.update_knowledge_module
     delete_knowledge_module = knowledge.delete_knowledge_module
+    start_document_upload = knowledge.start_document_upload
+    complete_document_upload = knowledge.complete_document_upload
+    abort_document_upload = knowledge.abort_document_upload
@@ -1,14 +1,26 @@
+from pathlib import Path
+
 import strawberry
 from sqlalchemy import select
 
 from app.api.graphql.context import GraphQLContext
-from app.api.graphql.types.knowledge import KnowledgeModuleType, KnowledgeModuleInput
+from app.api.graphql.types.knowledge import (
+    DocumentUploadType,
+    KnowledgeModuleType,
+    KnowledgeModuleInput,
+    UploadedPartInput,
+)
 from app.api.graphql.scalars import UUID as UUIDScalar
+from app.core.config import settings
+from app.core.async_storage import get_async_s3_client
 from app.crud.crud_knowledge import knowledge_module_crud
 from app.schemas.knowledge import KnowledgeModuleCreate, KnowledgeModuleUpdate
 from app.models.persona import Persona
+from app.services.ingestion.document_store import delete_document_module
+from app.services.ingestion.uploads import new_upload_key, plan_parts, upload_prefix
 
-from app.tasks.celery_config import celery_app
+from app.tasks.celery_config import enqueue_knowledge_module
+from app.tasks.debounce import schedule_knowledge_module
 
 
 @strawberry.mutation
@@ -47,8 +59,8 @@ async def add_knowledge_module(
         db=info.context.db, persona_id=persona_id, obj_in=module_create
     )
 
-    # Queue background task to process
-    celery_app.send_task("tasks.process_knowledge_module", args=[str(module.id)])
+    # Queue background task to process (fast or bulk queue by size)
+    enqueue_knowledge_module(module.id, module.module_type, module.content)
 
     return KnowledgeModuleType(
         id=module.id,
@@ -110,9 +122,12 @@ async def update_knowledge_module(
     if not updated_module:
         raise ValueError("Failed to update module")
 
-    # Re-process if content changed
+    # Re-process if content changed; bursts of edits are coalesced into one
+    # job, and a job already running for older content aborts
     if input.content:
-        celery_app.send_task("tasks.process_knowledge_module", args=[str(module.id)])
+        await schedule_knowledge_module(
+            updated_module.id, updated_module.module_type, updated_module.content
+        )
 
     return KnowledgeModuleType(
         id=updated_module.id,
@@ -155,8 +170,146 @@ async def delete_knowledge_module(
     if persona.user_id != info.context.current_user.id:
         raise PermissionError("Access denied")
 
-    # Delete module
-    success = await knowledge_module_crud.delete(
-        db=info.context.db, module_id=module_id
+    # Deletes the module together with its reference to the uploaded file
+    await delete_document_module(info.context.db, module, get_async_s3_client())
+    return True
+
+
+async def _get_owned_persona(
+    info: strawberry.Info[GraphQLContext], persona_id: UUIDScalar
+) -> Persona:
+    """Load a persona, checking it belongs to the current user."""
+    stmt = select(Persona).where(Persona.id == persona_id)
+    result = await info.context.db.execute(stmt)
+    persona = result.scalar_one_or_none()
+
+    if not persona:
+        raise ValueError("Persona not found")
+
+    if not info.context.current_user:
+        raise PermissionError("Authentication required")
+
+    if persona.user_id != info.context.current_user.id:
+        raise PermissionError("Access denied")
+
+    return persona
+
+
+def _check_upload_key(persona_id: UUIDScalar, storage_key: str) -> None:
+    # Keys are only ever issued under the persona's prefix
+    if not storage_key.startswith(upload_prefix(persona_id)):
+        raise PermissionError("Access denied")
+
+
+@strawberry.mutation
+async def start_document_upload(
+    info: strawberry.Info[GraphQLContext],
+    persona_id: UUIDScalar,
+    filename: str,
+    file_size: int,
+    content_type: str | None = None,
+) -> DocumentUploadType:
+    """
+    Start a direct-to-S3 multipart upload of a document.
+
+    The client PUTs each part of the file to its URL, then calls
+    completeDocumentUpload with the ETag returned for every part.
+    """
+    await _get_owned_persona(info, persona_id)
+
+    storage_key = new_upload_key(persona_id, filename)
+    part_size, part_count = plan_parts(file_size)
+    expires_in = settings.DOCUMENT_UPLOAD_URL_EXPIRATION
+
+    s3_client = get_async_s3_client()
+    upload_id = await s3_client.create_multipart_upload(storage_key, content_type)
+    part_urls = await s3_client.get_upload_part_urls(
+        storage_key, upload_id, part_count, expires_in
+    )
+
+    return DocumentUploadType(
+        storage_key=storage_key,
+        upload_id=upload_id,
+        part_size=part_size,
+        part_urls=part_urls,
+        expires_in=expires_in,
+    )
+
+
+@strawberry.mutation
+async def complete_document_upload(
+    info: strawberry.Info[GraphQLContext],
+    persona_id: UUIDScalar,
+    storage_key: str,
+    upload_id: str,
+    parts: list[UploadedPartInput],
+    title: str | None = None,
+    priority: int = 1,
+) -> KnowledgeModuleType:
+    """Finish a document upload, create its module and queue processing."""
+    await _get_owned_persona(info, persona_id)
+    _check_upload_key(persona_id, storage_key)
+
+    if not parts:
+        raise ValueError("No parts uploaded")
+
+    s3_client = get_async_s3_client()
+    await s3_client.complete_multipart_upload(
+        storage_key,
+        upload_id,
+        [{"PartNumber": part.part_number, "ETag": part.etag} for part in parts],
+    )
+
+    # Parts are only checked against the declared size by the client, so
+    # enforce the limit on the assembled object
+    file_size = await s3_client.get_size(storage_key)
+    if not file_size or file_size > settings.DOCUMENT_UPLOAD_MAX_MB * 1024 * 1024:
+        await s3_client.delete_file(storage_key)
+        raise ValueError(f"File exceeds {settings.DOCUMENT_UPLOAD_MAX_MB} MB")
+
+    file_name = Path(storage_key).name
+    module_create = KnowledgeModuleCreate(
+        module_type="document",
+        title=title or file_name,
+        content={"file_name": file_name, "file_size": file_size},
+        priority=priority,
     )
-    return success
+
+    module = await knowledge_module_crud.create(
+        db=info.context.db,
+        persona_id=persona_id,
+        obj_in=module_create,
+        file_storage_key=storage_key,
+    )
+
+    # Small files may go to the fast queue
+    enqueue_knowledge_module(module.id, module.module_type, size_hint=file_size)
+
+    return KnowledgeModuleType(
+        id=module.id,
+        persona_id=module.persona_id,
+        module_type=module.module_type,
+        title=module.title,
+        content=module.content,
+        priority=module.priority,
+        is_active=module.is_active,
+        metadata=module.module_metadata,
+        processing_status=module.processing_status.value,
+        created_at=module.created_at,
+        updated_at=module.updated_at,
+    )
+
+
+@strawberry.mutation
+async def abort_document_upload(
+    info: strawberry.Info[GraphQLContext],
+    persona_id: UUIDScalar,
+    storage_key: str,
+    upload_id: str,
+) -> bool:
+    """Abort an unfinished document upload and discard its parts."""
+    await _get_owned_persona(info, persona_id)
+    _check_upload_key(persona_id, storage_key)
+
+    await get_async_s3_client().abort_multipart_upload(storage_key, upload_id)
+    return True
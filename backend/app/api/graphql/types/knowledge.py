@@ -31,3 +31,24 @@ class KnowledgeModuleInput:
     priority: int = 1
     is_active: bool = True
     metadata: strawberry.scalars.JSON | None = None
+
+
+@strawberry.type
+class DocumentUploadType:
+    """Presigned multipart upload for a document file."""
+
+    storage_key: str
+    upload_id: str
+    part_size: int
+    part_urls: list[str] = strawberry.field(
+        description="PUT URL for each part, in part order (part N is index N-1)"
+    )
+    expires_in: int
+
+
+@strawberry.input
+class UploadedPartInput:
+    """A part uploaded with a presigned URL, with the ETag S3 returned."""
+
+    part_number: int
+    etag: str
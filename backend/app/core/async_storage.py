@@ -0,0 +1,119 @@
+"""
+Asyncio facade over S3Client for the API process.
+
+boto3 calls block, so every network call runs on a dedicated, bounded thread
+pool sized to the client's HTTP connection pool: resolvers await S3 without
+stalling the event loop, and S3 traffic can neither exhaust the default
+executor nor open more connections than the pool keeps alive. Batched deletes
+fan out concurrently.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from .config import settings
+from .storage import DELETE_BATCH_SIZE, S3Client, get_s3_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncS3Client:
+    def __init__(self, s3_client: S3Client, max_workers: int = 10):
+        self.sync = s3_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="s3"
+        )
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args))
+
+    async def file_exists(self, key: str) -> bool:
+        """Check if a file exists in S3."""
+        return await self._run(self.sync.file_exists, key)
+
+    async def get_size(self, key: str) -> Optional[int]:
+        """Size of an object in bytes, or None if it does not exist."""
+        return await self._run(self.sync.get_size, key)
+
+    async def delete_file(self, key: str) -> None:
+        """Delete a file from S3."""
+        await self._run(self.sync.delete_file, key)
+
+    async def delete_files(self, keys: List[str]) -> None:
+        """Delete objects, sending the DeleteObjects batches concurrently."""
+        batches = [
+            keys[start : start + DELETE_BATCH_SIZE]
+            for start in range(0, len(keys), DELETE_BATCH_SIZE)
+        ]
+        await asyncio.gather(
+            *(self._run(self.sync.delete_files, batch) for batch in batches)
+        )
+
+    async def delete_prefix(self, prefix: str) -> int:
+        """Delete every object under a prefix; returns how many were deleted."""
+        pages: List[List[str]] = await self._run(
+            lambda: list(self.sync.list_keys(prefix))
+        )
+        await asyncio.gather(*(self.delete_files(keys) for keys in pages))
+        return sum(len(keys) for keys in pages)
+
+    async def create_multipart_upload(
+        self, key: str, content_type: Optional[str] = None
+    ) -> str:
+        """Start a multipart upload and return its upload ID."""
+        return await self._run(self.sync.create_multipart_upload, key, content_type)
+
+    async def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: List[Dict]
+    ) -> None:
+        """Assemble an uploaded object from its parts."""
+        await self._run(self.sync.complete_multipart_upload, key, upload_id, parts)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Abort a multipart upload, discarding any uploaded parts."""
+        await self._run(self.sync.abort_multipart_upload, key, upload_id)
+
+    async def get_upload_part_urls(
+        self, key: str, upload_id: str, part_count: int, expiration: int = 3600
+    ) -> List[str]:
+        """Presigned PUT URLs for a multipart upload."""
+        # Local signing, but up to 10,000 parts is worth keeping off the loop
+        return await self._run(
+            self.sync.get_upload_part_urls, key, upload_id, part_count, expiration
+        )
+
+    def shutdown(self) -> None:
+        """Wait for in-flight calls and stop the thread pool."""
+        self._executor.shutdown(wait=True)
+
+
+_async_s3_client_instance: Optional[AsyncS3Client] = None
+
+
+def get_async_s3_client() -> AsyncS3Client:
+    """Get or create singleton async S3 client, sharing get_s3_client()."""
+    global _async_s3_client_instance
+
+    if _async_s3_client_instance is None:
+        _async_s3_client_instance = AsyncS3Client(
+            get_s3_client(),
+            max_workers=settings.S3_MAX_POOL_CONNECTIONS,
+        )
+
+    return _async_s3_client_instance
+
+
+def close_async_s3_client() -> None:
+    """Shut down the async client's thread pool (application shutdown)."""
+    global _async_s3_client_instance
+
+    if _async_s3_client_instance is not None:
+        _async_s3_client_instance.shutdown()
+        _async_s3_client_instance = None
+        logger.info("Async S3 client closed")
@@ -15,6 +15,10 @@ class BaseConfig(BaseSettings):
 
     DATABASE_URL: str
 
+    # pgvector HNSW build parameters for knowledge_chunks.embedding
+    VECTOR_INDEX_HNSW_M: int = 16
+    VECTOR_INDEX_HNSW_EF_CONSTRUCTION: int = 64
+
     @property
     def SYNC_DATABASE_URL(self) -> str:
         """
@@ -29,16 +29,127 @@ class Settings(BaseConfig):
     AWS_S3_BUCKET_NAME: str
     AWS_REGION: str
     AWS_S3_INTERNAL_ENDPOINT: str
+    # Endpoint browsers reach S3 at; presigned upload URLs are signed for it
     AWS_S3_PUBLIC_URL: str
+    # Downloads above one chunk use this many concurrent ranged GETs
+    S3_TRANSFER_MAX_CONCURRENCY: int = 8
+    S3_TRANSFER_CHUNK_MB: int = 8
+    # In-memory download buffers spill to a temp file beyond this size
+    S3_DOWNLOAD_SPOOL_MB: int = 16
+    # Block size of ranged reads when only part of an object is needed
+    # (counting PDF pages, reading a fan-out task's page range)
+    S3_RANGE_BLOCK_KB: int = 256
+    # HTTP connections per S3 client, also the size of the thread pool that
+    # runs AsyncS3Client calls
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    # Direct-to-S3 document uploads: size limit, part size (raised when
+    # needed to stay within S3's 10,000 parts) and presigned URL lifetime
+    DOCUMENT_UPLOAD_MAX_MB: int = 512
+    DOCUMENT_UPLOAD_PART_MB: int = 16
+    DOCUMENT_UPLOAD_URL_EXPIRATION: int = 3600  # seconds
 
     EMBEDDING_MODEL: str = "sentence-transformers/all-mpnet-base-v2"
+    # Document embedding batches: texts are sorted by length and grouped so
+    # each batch stays under EMBEDDING_BATCH_TOKEN_BUDGET padded tokens
+    # (longest text x batch size) and EMBEDDING_BATCH_SIZE items
     EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_TOKEN_BUDGET: int = 8192
+    # Ingestion skips texts that fail to embed on their own, up to this many
+    # per module; beyond that the model itself is assumed broken and it raises
+    EMBEDDING_MAX_SKIPPED: int = 20
+    # "torch" (fp32 sentence-transformers) or "onnx" (ONNX Runtime, optional
+    # int8 dynamic quantization; needs optimum[onnxruntime])
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_QUANTIZE: bool = True
+    EMBEDDING_ONNX_DIR: str = ""  # export cache, defaults to ~/.cache/anonchat/onnx
+
+    # Query embedding cache: in-process LRU in front of a shared Redis tier
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    QUERY_EMBEDDING_CACHE_TTL: int = 900  # seconds
+    QUERY_EMBEDDING_REDIS_TTL: int = 86400  # seconds
+    # Content-addressed chunk embeddings reused across ingestions (sliding TTL)
+    DOCUMENT_EMBEDDING_CACHE_TTL: int = 30 * 86400  # seconds
+
+    # Async query embedding: cross-request micro-batches on a thread pool
+    EMBEDDING_QUERY_BATCH_SIZE: int = 16
+    EMBEDDING_QUERY_BATCH_WAIT_MS: float = 5.0
+    EMBEDDING_QUERY_WORKERS: int = 1
+
+    # Optional shared embedding server (python -m app.services.embeddings.server)
+    # e.g. "unix:///tmp/anonchat-embeddings.sock" or "tcp://127.0.0.1:8765".
+    # Empty means every process loads its own copy of the model.
+    EMBEDDING_SERVICE_URL: str = ""
+    EMBEDDING_SERVICE_TIMEOUT: float = 30.0
+    EMBEDDING_SERVICE_BATCH_SIZE: int = 64
+    EMBEDDING_SERVICE_BATCH_WAIT_MS: float = 5.0
 
     GEMINI_API_KEY: str
     GEMINI_CHAT_LLM: str = "gemini-2.5-flash"
 
     CHUNK_SIZE_TOKENS: int = 500
     CHUNK_OVERLAP_TOKENS: int = 50
+    # End chunks on a boundary: "" (off), "sentence" or "paragraph"
+    CHUNK_SNAP_TO: str = ""
+
+    # CSV/.xlsx rows rendered per streamed document (with header context)
+    INGESTION_TABLE_ROWS_PER_GROUP: int = 50
+
+    # PDF text extraction process pool, one per process and reused (0
+    # workers = the CPUs divided between the Celery pool children).
+    # Documents under INGESTION_PDF_PARALLEL_MIN_PAGES are extracted serially.
+    INGESTION_PDF_WORKERS: int = 0
+    INGESTION_PDF_PAGES_PER_JOB: int = 8
+    INGESTION_PDF_PARALLEL_MIN_PAGES: int = 16
+    INGESTION_PDF_WORKER_MEMORY_MB: int = 1024
+    INGESTION_PDF_WORKER_MAX_TASKS: int = 50
+
+    # PDFs with at least this many pages are ingested by a Celery chord of
+    # page-range subtasks instead of a single task
+    INGESTION_FANOUT_MIN_PAGES: int = 40
+    INGESTION_FANOUT_PAGES_PER_TASK: int = 20
+    # Jobs up to these sizes go to the "fast" Celery queue, larger ones and
+    # all scraping to "bulk" (see app/tasks/celery_config.select_queue)
+    INGESTION_FAST_MAX_CHARS: int = 50_000
+    INGESTION_FAST_MAX_BYTES: int = 512 * 1024
+    # Load the embedding model in the Celery parent before forking, so pool
+    # children share it copy-on-write (torch backend, no EMBEDDING_SERVICE_URL)
+    CELERY_WORKER_PRELOAD_MODEL: bool = True
+    # torch threads per pool child; 0 means cpu_count // concurrency
+    CELERY_WORKER_TORCH_THREADS: int = 0
+    # Edits within this window are coalesced into one re-processing job
+    INGESTION_DEBOUNCE_SECONDS: float = 10.0
+    # Extra lifetime of the "job pending" flag beyond the debounce window
+    INGESTION_DEBOUNCE_PENDING_TTL: int = 600  # seconds
+
+    # url_source crawling: concurrent requests per host, page budget when
+    # following links, request timeout and page size limit
+    WEB_CRAWL_PER_HOST_CONCURRENCY: int = 4
+    WEB_CRAWL_MAX_PAGES: int = 20
+    WEB_CRAWL_TIMEOUT: float = 20.0
+    WEB_CRAWL_MAX_BYTES: int = 5 * 1024 * 1024
+    WEB_CRAWL_USER_AGENT: str = "AnonChatBot/1.0"
+    # url_source modules are re-crawled (conditionally) once this old; beat
+    # checks every WEB_REFRESH_CHECK_MINUTES
+    WEB_REFRESH_INTERVAL_HOURS: int = 24
+    WEB_REFRESH_CHECK_MINUTES: int = 60
+
+    # Beat corrects shared upload reference counts (modules deleted by the
+    # persona cascade) this often
+    DOCUMENT_BLOB_RECONCILE_MINUTES: int = 360
+
+    # Default HNSW candidate list size per query (SET LOCAL hnsw.ef_search)
+    VECTOR_SEARCH_EF_SEARCH: int = 40
+    # Two-phase retrieval: ANN candidates fetched per requested result, and
+    # similarity bonus per module priority step when re-ranking them
+    VECTOR_SEARCH_CANDIDATE_MULTIPLIER: int = 4
+    VECTOR_SEARCH_PRIORITY_WEIGHT: float = 0.02
+    # The HNSW scan runs before the persona/is_active filter, so a plain scan
+    # yields at most ef_search rows across all personas. Iterative scans
+    # (pgvector >= 0.8) keep walking the graph until enough rows pass the
+    # filter, up to VECTOR_SEARCH_MAX_SCAN_TUPLES visited tuples.
+    # "relaxed_order", "strict_order", or "off" for pgvector < 0.8.
+    VECTOR_SEARCH_ITERATIVE_SCAN: str = "relaxed_order"
+    VECTOR_SEARCH_MAX_SCAN_TUPLES: int = 20_000
 
 
 settings = Settings()
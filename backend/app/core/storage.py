@@ -1,13 +1,108 @@
+import io
 import tempfile
 import os
 from pathlib import Path
-from typing import Optional, BinaryIO
+from typing import Dict, Iterator, List, Optional, BinaryIO
+from collections import OrderedDict
 from contextlib import contextmanager
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from botocore.config import Config
 
+MB = 1024 * 1024
+
+# Most keys one DeleteObjects request accepts
+DELETE_BATCH_SIZE = 1000
+
+
+class S3RangeFile(io.RawIOBase):
+    """
+    Read-only, seekable view of an S3 object that fetches only what is read.
+
+    The object is read in aligned blocks of block_size, one ranged GET each,
+    and the most recently used max_blocks blocks are kept, so parsers that
+    seek back and forth (pypdf following object references) fetch every
+    block they touch once.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket_name: str,
+        key: str,
+        size: int,
+        block_size: int = 256 * 1024,
+        max_blocks: int = 64,
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.size = size
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.position = 0
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        # Number of GETs and bytes fetched, for diagnostics
+        self.requests = 0
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def _block(self, index: int) -> bytes:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        first = index * self.block_size
+        last = min(first + self.block_size, self.size) - 1
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket_name, Key=self.key, Range=f"bytes={first}-{last}"
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to read file {self.key}: {str(e)}")
+        block = response["Body"].read()
+        self.requests += 1
+        self.bytes_read += len(block)
+
+        self._blocks[index] = block
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def readinto(self, buffer) -> int:
+        # Filled across block boundaries: parsers expect read(n) to return
+        # n bytes unless at end of file
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view) and self.position < self.size:
+            index, offset = divmod(self.position, self.block_size)
+            data = self._block(index)[offset : offset + len(view) - filled]
+            view[filled : filled + len(data)] = data
+            filled += len(data)
+            self.position += len(data)
+        return filled
+
 
 class S3Client:
     def __init__(
@@ -17,8 +112,22 @@ class S3Client:
         secret_access_key: str,
         bucket_name: str,
         region: str = "us-east-1",
+        public_endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 10,
+        transfer_concurrency: int = 8,
+        transfer_chunk_size: int = 8 * MB,
+        spool_max_size: int = 16 * MB,
+        range_block_size: int = 256 * 1024,
     ):
         self.bucket_name = bucket_name
+        self.spool_max_size = spool_max_size
+        self.range_block_size = range_block_size
+        # Objects above one chunk are fetched with concurrent ranged GETs
+        self.transfer_config = TransferConfig(
+            multipart_threshold=transfer_chunk_size,
+            multipart_chunksize=transfer_chunk_size,
+            max_concurrency=transfer_concurrency,
+        )
 
         self.client = boto3.client(
             "s3",
@@ -29,13 +138,31 @@ class S3Client:
             config=Config(
                 signature_version="s3v4",
                 retries={"max_attempts": 3, "mode": "adaptive"},
+                # boto3 clients are thread-safe; one connection per thread
+                # of AsyncS3Client's executor
+                max_pool_connections=max_pool_connections,
             ),
         )
+        # URLs handed to browsers must be signed for the host they will use;
+        # presigning is local, so this client never opens a connection
+        if public_endpoint_url and public_endpoint_url != endpoint_url:
+            self.presign_client = boto3.client(
+                "s3",
+                endpoint_url=public_endpoint_url,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                region_name=region,
+                config=Config(signature_version="s3v4"),
+            )
+        else:
+            self.presign_client = self.client
 
     def download_file(self, key: str, local_path: str) -> None:
         """Download a file from S3 to local path."""
         try:
-            self.client.download_file(self.bucket_name, key, local_path)
+            self.client.download_file(
+                self.bucket_name, key, local_path, Config=self.transfer_config
+            )
         except ClientError as e:
             raise Exception(f"Failed to download file {key}: {str(e)}")
 
@@ -53,6 +180,18 @@ class S3Client:
         except ClientError as e:
             raise Exception(f"Failed to upload file object {key}: {str(e)}")
 
+    def copy_file(self, source_key: str, key: str) -> None:
+        """Copy an object within the bucket (multipart for large objects)."""
+        try:
+            self.client.copy(
+                {"Bucket": self.bucket_name, "Key": source_key},
+                self.bucket_name,
+                key,
+                Config=self.transfer_config,
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to copy file {source_key} to {key}: {str(e)}")
+
     def delete_file(self, key: str) -> None:
         """Delete a file from S3."""
         try:
@@ -60,6 +199,43 @@ class S3Client:
         except ClientError as e:
             raise Exception(f"Failed to delete file {key}: {str(e)}")
 
+    def delete_files(self, keys: List[str]) -> None:
+        """Delete objects in batches of DELETE_BATCH_SIZE (one request each)."""
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start : start + DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except ClientError as e:
+                raise Exception(f"Failed to delete {len(batch)} files: {str(e)}")
+            errors = response.get("Errors", [])
+            if errors:
+                raise Exception(
+                    f"Failed to delete {len(errors)} files, e.g. "
+                    f"{errors[0].get('Key')}: {errors[0].get('Message')}"
+                )
+
+    def list_keys(self, prefix: str) -> Iterator[List[str]]:
+        """Yield the keys under a prefix, one listing page (<= 1000) at a time."""
+        try:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                keys = [obj["Key"] for obj in page.get("Contents", [])]
+                if keys:
+                    yield keys
+        except ClientError as e:
+            raise Exception(f"Failed to list files under {prefix}: {str(e)}")
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every object under a prefix; returns how many were deleted."""
+        deleted = 0
+        for keys in self.list_keys(prefix):
+            self.delete_files(keys)
+            deleted += len(keys)
+        return deleted
+
     def file_exists(self, key: str) -> bool:
         """Check if a file exists in S3."""
         try:
@@ -68,6 +244,101 @@ class S3Client:
         except ClientError:
             return False
 
+    def get_etag(self, key: str) -> Optional[str]:
+        """ETag of an object (without quotes), or None if it does not exist."""
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise Exception(f"Failed to stat file {key}: {str(e)}")
+        return response["ETag"].strip('"')
+
+    def open_file(self, key: str) -> Optional[BinaryIO]:
+        """Open an object as a readable stream, or None if it does not exist."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise Exception(f"Failed to open file {key}: {str(e)}")
+        return response["Body"]
+
+    def get_size(self, key: str) -> Optional[int]:
+        """Size of an object in bytes, or None if it does not exist."""
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise Exception(f"Failed to stat file {key}: {str(e)}")
+        return response["ContentLength"]
+
+    def create_multipart_upload(
+        self, key: str, content_type: Optional[str] = None
+    ) -> str:
+        """Start a multipart upload and return its upload ID."""
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if content_type:
+            params["ContentType"] = content_type
+        try:
+            return self.client.create_multipart_upload(**params)["UploadId"]
+        except ClientError as e:
+            raise Exception(f"Failed to start multipart upload {key}: {str(e)}")
+
+    def get_upload_part_urls(
+        self, key: str, upload_id: str, part_count: int, expiration: int = 3600
+    ) -> List[str]:
+        """Presigned PUT URLs for parts 1..part_count of a multipart upload."""
+        try:
+            return [
+                self.presign_client.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": self.bucket_name,
+                        "Key": key,
+                        "UploadId": upload_id,
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=expiration,
+                )
+                for part_number in range(1, part_count + 1)
+            ]
+        except ClientError as e:
+            raise Exception(f"Failed to presign upload parts for {key}: {str(e)}")
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: List[Dict]
+    ) -> None:
+        """
+        Assemble an uploaded object from its parts.
+
+        Args:
+            key: Object key
+            upload_id: ID from create_multipart_upload
+            parts: {"PartNumber": int, "ETag": str} for every uploaded part
+        """
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": sorted(parts, key=lambda part: part["PartNumber"])
+                },
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to complete multipart upload {key}: {str(e)}")
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Abort a multipart upload, discarding any uploaded parts."""
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to abort multipart upload {key}: {str(e)}")
+
     def get_file_url(self, key: str, expiration: int = 3600) -> str:
         """Generate a presigned URL for the file."""
         try:
@@ -100,6 +371,52 @@ class S3Client:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
 
+    @contextmanager
+    def download_to_buffer(self, key: str):
+        """
+        Download a file into a seekable buffer and yield it.
+
+        The buffer stays in memory up to spool_max_size and spills to an
+        anonymous temp file beyond that; large objects are fetched with
+        concurrent ranged GETs. Closed after use.
+        """
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)
+        try:
+            try:
+                self.client.download_fileobj(
+                    self.bucket_name, key, buffer, Config=self.transfer_config
+                )
+            except ClientError as e:
+                raise Exception(f"Failed to download file {key}: {str(e)}")
+            buffer.seek(0)
+            yield buffer
+        finally:
+            buffer.close()
+
+    @contextmanager
+    def open_ranged(self, key: str):
+        """
+        Open an object as a seekable file that downloads only what is read.
+
+        Reads are fetched in range_block_size ranged GETs, so a parser that
+        seeks to the parts it needs (e.g. pypdf reading a page count) reads
+        a fraction of a large object. Closed after use.
+        """
+        size = self.get_size(key)
+        if size is None:
+            raise Exception(f"File not found: {key}")
+        file = S3RangeFile(
+            self.client,
+            self.bucket_name,
+            key,
+            size,
+            block_size=self.range_block_size,
+        )
+        try:
+            yield file
+        finally:
+            file.close()
+
 
 _s3_client_instance: Optional[S3Client] = None
 
@@ -117,6 +434,12 @@ def get_s3_client() -> S3Client:
             secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             bucket_name=settings.AWS_S3_BUCKET_NAME,
             region=settings.AWS_REGION,
+            public_endpoint_url=settings.AWS_S3_PUBLIC_URL,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            transfer_concurrency=settings.S3_TRANSFER_MAX_CONCURRENCY,
+            transfer_chunk_size=settings.S3_TRANSFER_CHUNK_MB * MB,
+            spool_max_size=settings.S3_DOWNLOAD_SPOOL_MB * MB,
+            range_block_size=settings.S3_RANGE_BLOCK_KB * 1024,
         )
 
     return _s3_client_instance
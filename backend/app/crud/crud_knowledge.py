@@ -11,11 +11,16 @@ class CRUDKnowledgeModule:
     """CRUD operations for knowledge modules."""
 
     async def create(
-        self, db: AsyncSession, persona_id: UUID, obj_in: KnowledgeModuleCreate
+        self,
+        db: AsyncSession,
+        persona_id: UUID,
+        obj_in: KnowledgeModuleCreate,
+        file_storage_key: Optional[str] = None,
     ) -> KnowledgeModule:
         """Create new knowledge module."""
         db_obj = KnowledgeModule(
             persona_id=persona_id,
+            file_storage_key=file_storage_key,
             module_type=obj_in.module_type,
             title=obj_in.title,
             content=obj_in.content,
@@ -5,7 +5,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.routes import api_router
 from app.api.graphql import graphql_router
+from app.core.async_storage import close_async_s3_client
 from app.core.config import settings
+from app.services.embeddings.tools import get_embedding_tools
 from app.middleware import RequestLoggingMiddleware, SecurityMiddleware
 
 
@@ -14,7 +16,10 @@ async def lifespan(app: FastAPI):
     """
     Manages the application's lifespan events
     """
+    # Load the embedding model up front rather than on the first chat turn
+    get_embedding_tools()
     yield
+    close_async_s3_client()
 
 
 app = FastAPI(title="Anonymous Chat API", lifespan=lifespan)
@@ -2,7 +2,7 @@ from .base import Base
 from .request_log import RequestLog, RequestMethod
 from .user import User
 from .persona import Persona
-from .knowledge import KnowledgeModule, KnowledgeChunk
+from .knowledge import KnowledgeModule, KnowledgeChunk, DocumentBlob
 from .conversation import Conversation, Message
 from .knowledge import KnowledgeModule, KnowledgeChunk
 
@@ -14,6 +14,7 @@ __all__ = [
     "Persona",
     "KnowledgeModule",
     "KnowledgeChunk",
+    "DocumentBlob",
     "Conversation",
     "Message",
 ]
@@ -1,6 +1,7 @@
 import uuid
 from enum import Enum as PyEnum
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -48,6 +49,13 @@ class KnowledgeModule(Base):
     is_active = Column(Boolean, default=True, nullable=False, index=True)
     module_metadata = Column(JSONB, nullable=True)
     file_storage_key = Column(String(255), nullable=True)
+    # sha256 of the uploaded file once it has moved to shared storage
+    content_hash = Column(
+        String(64),
+        ForeignKey("document_blobs.content_hash"),
+        nullable=True,
+        index=True,
+    )
     processing_status = Column(
         Enum(
             ProcessingStatus,
@@ -79,6 +87,29 @@ class KnowledgeModule(Base):
         return f"<KnowledgeModule(id={self.id}, type={self.module_type})>"
 
 
+class DocumentBlob(Base):
+    """
+    Content-addressed uploaded file, shared by every module that uploaded it.
+
+    ref_count counts the modules pointing at it; the S3 object is deleted
+    when the last of them is.
+    """
+
+    __tablename__ = "document_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    storage_key = Column(String(255), nullable=False, unique=True)
+    file_size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self):
+        return f"<DocumentBlob(hash={self.content_hash}, refs={self.ref_count})>"
+
+
 class KnowledgeChunk(Base):
     """
     Text chunks with embeddings for RAG.
@@ -100,6 +131,8 @@ class KnowledgeChunk(Base):
     embedding = Column(Vector(768), nullable=True)
     token_count = Column(Integer, nullable=True)
     chunk_metadata = Column(JSONB, nullable=True)
+    # sha256 of chunk_text; lets re-ingestion keep unchanged chunks
+    content_hash = Column(String(64), nullable=True)
 
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
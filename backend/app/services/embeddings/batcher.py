@@ -0,0 +1,134 @@
+"""Cross-request micro-batching for embedding calls."""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingBatcher:
+    """
+    Gathers concurrent embedding requests into micro-batches.
+
+    Callers await ``embed`` from the event loop. A background task drains the
+    queue into batches of at most ``max_batch_size`` texts, waiting at most
+    ``max_wait_ms`` for a batch to fill, and runs each batch on a dedicated
+    thread pool so CPU inference never blocks the loop. While the pool is
+    busy, new requests pile up and are served together by the next batch, so
+    throughput grows with concurrency instead of serializing.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_workers: int = 1,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="embedding-batcher"
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set[asyncio.Task] = set()
+
+    def _ensure_worker(self) -> None:
+        """Start (or restart) the dispatcher on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._worker = loop.create_task(self._dispatch_loop())
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed one text as part of the next micro-batch."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts; they may be split across or merged into batches."""
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Only form a batch once a worker is free; anything queued while
+            # the pool is busy joins that batch.
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = loop.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            pending = [(text, future) for text, future in batch if not future.done()]
+            if not pending:
+                return
+
+            texts = [text for text, _ in pending]
+            try:
+                embeddings = await loop.run_in_executor(
+                    self._executor, self.embed_fn, texts
+                )
+                if len(embeddings) != len(texts):
+                    raise ValueError(
+                        f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+                    )
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), embedding in zip(pending, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Stop the dispatcher and release the thread pool."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
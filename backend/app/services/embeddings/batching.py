@@ -0,0 +1,42 @@
+"""Length-aware batch planning for document embedding."""
+
+from typing import List, Sequence
+
+
+def plan_batches(
+    lengths: Sequence[int], token_budget: int, max_items: int
+) -> List[List[int]]:
+    """
+    Group item indices into batches of similar length under a token budget.
+
+    Items are sorted longest first, so each batch pads to roughly its own
+    length instead of the longest chunk in the corpus, and the most
+    memory-hungry batch runs first. A batch's cost is its padded size
+    (longest item x item count), which is what the model actually computes.
+
+    Args:
+        lengths: Token length of each item
+        token_budget: Max padded tokens per batch (an oversized item still
+            gets a batch of its own)
+        max_items: Max items per batch
+
+    Returns:
+        Batches of indices into `lengths`; every index appears exactly once
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_max = 0
+
+    for index in order:
+        length = max(lengths[index], 1)
+        padded = max(batch_max, length) * (len(batch) + 1)
+        if batch and (len(batch) >= max_items or padded > token_budget):
+            batches.append(batch)
+            batch, batch_max = [], 0
+        batch.append(index)
+        batch_max = max(batch_max, length)
+
+    if batch:
+        batches.append(batch)
+    return batches
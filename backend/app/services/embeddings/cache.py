@@ -0,0 +1,255 @@
+"""Caches for embeddings keyed by normalized text."""
+
+import base64
+import hashlib
+import logging
+import struct
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import async_redis_pool, sync_get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalize and collapse whitespace so trivial variants share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def encode_embedding(embedding: List[float]) -> str:
+    """Pack an embedding as base64 float32 (the Redis pools decode responses)."""
+    packed = struct.pack(f"<{len(embedding)}f", *embedding)
+    return base64.b64encode(packed).decode("ascii")
+
+
+def decode_embedding(value: str) -> List[float]:
+    """Inverse of encode_embedding."""
+    raw = base64.b64decode(value)
+    return list(struct.unpack(f"<{len(raw) // 4}f", raw))
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, List[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query embeddings.
+
+    An in-process LRU answers repeated queries without any I/O; a shared Redis
+    tier lets every API worker reuse embeddings computed by the others. Keys
+    include the model name, so switching EMBEDDING_MODEL invalidates them.
+    """
+
+    KEY_PREFIX = "emb:query"
+
+    def __init__(
+        self,
+        model_name: str,
+        max_size: int = settings.QUERY_EMBEDDING_CACHE_SIZE,
+        ttl_seconds: int = settings.QUERY_EMBEDDING_CACHE_TTL,
+        redis_ttl_seconds: int = settings.QUERY_EMBEDDING_REDIS_TTL,
+    ):
+        self.model_name = model_name
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.local = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def key(self, text: str) -> str:
+        """Cache key for a query under the current model."""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}:{self.model_name}:{digest}"
+
+    def get_local(self, key: str) -> Optional[List[float]]:
+        """Look up the in-process tier only (safe from sync code)."""
+        value = self.local.get(key)
+        self._count("local_hits" if value is not None else "misses")
+        return value
+
+    def set_local(self, key: str, embedding: List[float]) -> None:
+        self.local.set(key, embedding)
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """Look up the in-process tier, then Redis; Redis hits are promoted."""
+        value = self.local.get(key)
+        if value is not None:
+            self._count("local_hits")
+            return value
+
+        try:
+            client = redis.Redis(connection_pool=async_redis_pool)
+            raw = await client.get(key)
+        except RedisError as e:
+            logger.warning(f"Query embedding cache read failed: {e}")
+            self._count("errors")
+            raw = None
+
+        if raw is None:
+            self._count("misses")
+            return None
+
+        value = decode_embedding(raw)
+        self.local.set(key, value)
+        self._count("redis_hits")
+        return value
+
+    async def set(self, key: str, embedding: List[float]) -> None:
+        """Store in both tiers; Redis failures only cost the shared tier."""
+        self.local.set(key, embedding)
+        try:
+            client = redis.Redis(connection_pool=async_redis_pool)
+            await client.set(
+                key, encode_embedding(embedding), ex=self.redis_ttl_seconds
+            )
+        except RedisError as e:
+            logger.warning(f"Query embedding cache write failed: {e}")
+            self._count("errors")
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus the derived hit rate."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["local_hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+        )
+        stats["local_size"] = len(self.local)
+        return stats
+
+
+class DocumentEmbeddingCache:
+    """
+    Content-addressed store of chunk embeddings for ingestion.
+
+    Keys are hash(model, normalized chunk text), so a chunk that was embedded
+    before (an unchanged page of a re-uploaded PDF, boilerplate shared across
+    personas) is never embedded again. Entries live in Redis with a sliding
+    TTL, refreshed on every hit, so unused embeddings age out.
+    """
+
+    KEY_PREFIX = "emb:doc"
+    # Keys per MGET/pipeline round trip
+    BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        model_name: str,
+        ttl_seconds: int = settings.DOCUMENT_EMBEDDING_CACHE_TTL,
+    ):
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}:{self.model_name}:{digest}"
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Bulk lookup; returns one embedding or None per text, in order.
+
+        Redis being unavailable degrades to all misses rather than failing
+        ingestion.
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        if not texts:
+            return results
+
+        keys = [self.key(text) for text in texts]
+        try:
+            with sync_get_redis_client() as client:
+                for start in range(0, len(keys), self.BATCH_SIZE):
+                    batch_keys = keys[start : start + self.BATCH_SIZE]
+                    values = client.mget(batch_keys)
+                    pipe = client.pipeline(transaction=False)
+                    for offset, (key, value) in enumerate(zip(batch_keys, values)):
+                        if value is not None:
+                            results[start + offset] = decode_embedding(value)
+                            pipe.expire(key, self.ttl_seconds)
+                    pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Document embedding cache read failed: {e}")
+            self._count("errors")
+
+        hits = sum(1 for r in results if r is not None)
+        self._count("hits", hits)
+        self._count("misses", len(texts) - hits)
+        return results
+
+    def set_many(self, texts: List[str], embeddings: List[List[float]]) -> None:
+        """Store embeddings for texts; failures are logged and ignored."""
+        if not texts:
+            return
+        try:
+            with sync_get_redis_client() as client:
+                for start in range(0, len(texts), self.BATCH_SIZE):
+                    pipe = client.pipeline(transaction=False)
+                    for text, embedding in zip(
+                        texts[start : start + self.BATCH_SIZE],
+                        embeddings[start : start + self.BATCH_SIZE],
+                    ):
+                        pipe.set(
+                            self.key(text),
+                            encode_embedding(embedding),
+                            ex=self.ttl_seconds,
+                        )
+                    pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Document embedding cache write failed: {e}")
+            self._count("errors")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
@@ -4,17 +4,52 @@ from app.core.config import settings
 
 EMBEDDING_MODEL_NAME = settings.EMBEDDING_MODEL
 
+# Identifies the exact embedding function (model + backend) for cache keys,
+# since quantized ONNX vectors are close to, but not bit-identical with, fp32.
+if settings.EMBEDDING_BACKEND == "onnx":
+    EMBEDDING_MODEL_ID = f"{EMBEDDING_MODEL_NAME}@onnx" + (
+        "-int8" if settings.EMBEDDING_ONNX_QUANTIZE else ""
+    )
+else:
+    EMBEDDING_MODEL_ID = EMBEDDING_MODEL_NAME
+
 
 class EmbeddingModel:
     _embedding_model = None
 
     @classmethod
-    def get_embedding_model(cls):
-        if cls._embedding_model is None:
-            print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}")
-            cls._embedding_model = HuggingFaceEmbeddings(
+    def load_local_model(cls):
+        """Load the model into this process, ignoring EMBEDDING_SERVICE_URL."""
+        print(f"Loading embedding model: {EMBEDDING_MODEL_ID}")
+        if settings.EMBEDDING_BACKEND == "onnx":
+            from .onnx_backend import OnnxEmbeddings
+
+            model = OnnxEmbeddings(
+                model_name=EMBEDDING_MODEL_NAME,
+                quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+            )
+        elif settings.EMBEDDING_BACKEND == "torch":
+            model = HuggingFaceEmbeddings(
                 model_name=EMBEDDING_MODEL_NAME,
                 model_kwargs={"device": "cpu"},
             )
-            print(f"Embedding model loaded")
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {settings.EMBEDDING_BACKEND}")
+        print(f"Embedding model loaded")
+        return model
+
+    @classmethod
+    def get_embedding_model(cls):
+        if cls._embedding_model is None:
+            if settings.EMBEDDING_SERVICE_URL:
+                # Shared per-node server: no model weights in this process
+                from .service import RemoteEmbeddings
+
+                cls._embedding_model = RemoteEmbeddings(
+                    url=settings.EMBEDDING_SERVICE_URL,
+                    timeout=settings.EMBEDDING_SERVICE_TIMEOUT,
+                )
+            else:
+                cls._embedding_model = cls.load_local_model()
         return cls._embedding_model
@@ -0,0 +1,202 @@
+"""
+Quantized ONNX Runtime backend for the CPU embedding model.
+
+The sentence-transformers model is exported to ONNX once (via optimum), its
+weights are dynamically quantized to int8, and inference runs through ONNX
+Runtime with the same mean pooling + L2 normalization as the torch pipeline.
+
+Requires the optional packages ``optimum[onnxruntime]`` (export) and
+``onnxruntime`` (serving). Use scripts/benchmark_embeddings.py to check
+cosine parity against the fp32 model before switching EMBEDDING_BACKEND.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+DEFAULT_ONNX_DIR = Path.home() / ".cache" / "anonchat" / "onnx"
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model_int8.onnx"
+SBERT_CONFIG_FILENAME = "sentence_bert_config.json"
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    """Directory holding the exported model and tokenizer for model_name."""
+    root = Path(settings.EMBEDDING_ONNX_DIR) if settings.EMBEDDING_ONNX_DIR else None
+    return (root or DEFAULT_ONNX_DIR) / model_name.replace("/", "__")
+
+
+def export_onnx_model(model_name: str, output_dir: Path, quantize: bool = True) -> Path:
+    """
+    Export model_name to ONNX (and optionally int8-quantize it).
+
+    The export is written to a temporary sibling directory and renamed into
+    place, so concurrent workers never load a half-written model.
+
+    Returns:
+        Path to the ONNX file to serve
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        raise ImportError(
+            "The onnx embedding backend requires 'optimum[onnxruntime]'"
+        ) from e
+
+    target = output_dir / (INT8_FILENAME if quantize else FP32_FILENAME)
+    if target.exists():
+        return target
+
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=output_dir.parent, prefix=".export-"))
+    try:
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(staging)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(staging)
+        _copy_sbert_config(model_name, staging)
+        if quantize:
+            quantize_dynamic(
+                str(staging / FP32_FILENAME),
+                str(staging / INT8_FILENAME),
+                weight_type=QuantType.QInt8,
+            )
+
+        if output_dir.exists():
+            # Another process finished first; keep its files, add ours if new
+            for item in staging.iterdir():
+                if not (output_dir / item.name).exists():
+                    os.replace(item, output_dir / item.name)
+        else:
+            os.replace(staging, output_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return target
+
+
+def _copy_sbert_config(model_name: str, model_dir: Path) -> None:
+    """Fetch the model's sentence-transformers config into model_dir, if any."""
+    try:
+        from huggingface_hub import hf_hub_download
+
+        path = hf_hub_download(model_name, SBERT_CONFIG_FILENAME)
+    except Exception:
+        # Not a sentence-transformers repo, or offline
+        return
+    shutil.copyfile(path, model_dir / SBERT_CONFIG_FILENAME)
+
+
+def resolve_max_length(model_name: str, model_dir: Path, tokenizer) -> int:
+    """
+    Token limit the torch pipeline truncates to, for parity.
+
+    sentence-transformers uses max_seq_length from sentence_bert_config.json
+    (often below what the transformer supports); otherwise the tokenizer's
+    limit, capped by the model's position embeddings.
+    """
+    sbert_config = model_dir / SBERT_CONFIG_FILENAME
+    if not sbert_config.exists():
+        # Exported before the config was saved alongside the model
+        _copy_sbert_config(model_name, model_dir)
+    if sbert_config.exists():
+        max_seq_length = json.loads(sbert_config.read_text()).get("max_seq_length")
+        if max_seq_length:
+            return int(max_seq_length)
+
+    limits = [tokenizer.model_max_length]
+    model_config = model_dir / "config.json"
+    if model_config.exists():
+        positions = json.loads(model_config.read_text()).get("max_position_embeddings")
+        if positions:
+            limits.append(positions)
+    return int(min(limits))
+
+
+class OnnxEmbeddings(Embeddings):
+    """langchain Embeddings served by ONNX Runtime on CPU."""
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = True,
+        model_dir: Optional[Path] = None,
+        batch_size: int = 32,
+        max_length: Optional[int] = None,
+        normalize: bool = True,
+        intra_op_threads: int = 0,
+    ):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backend requires 'onnxruntime'"
+            ) from e
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize = normalize
+
+        model_dir = model_dir or onnx_model_dir(model_name)
+        model_path = export_onnx_model(model_name, model_dir, quantize=quantize)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length or resolve_max_length(
+            model_name, model_dir, self.tokenizer
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        embeddings: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[i : i + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self._input_names
+            }
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, as in the sentence-transformers config
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(
+                mask.sum(axis=1), 1e-9, None
+            )
+            if self.normalize:
+                norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+                pooled = pooled / np.clip(norms, 1e-12, None)
+            embeddings.extend(pooled.tolist())
+
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
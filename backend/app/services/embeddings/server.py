@@ -0,0 +1,108 @@
+"""
+Standalone local embedding server.
+
+Hosts one copy of the embedding model per node and serves every uvicorn and
+Celery process on it over a Unix socket or localhost TCP. Requests from all
+connections are merged into dynamic batches by EmbeddingBatcher.
+
+Run with:
+    python -m app.services.embeddings.server [--url unix:///tmp/anonchat-embeddings.sock]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import stat
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+from .batcher import EmbeddingBatcher
+from .cache import encode_embedding
+from .model import EMBEDDING_MODEL_ID, EmbeddingModel
+from .service import encode_frame, parse_service_url, read_frame_async
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_URL = "unix:///tmp/anonchat-embeddings.sock"
+
+
+class EmbeddingServer:
+    """Serves embedding requests from a single in-process model."""
+
+    def __init__(self, url: str, model=None):
+        self.url = url
+        self.model = model or EmbeddingModel.load_local_model()
+        self.batcher = EmbeddingBatcher(
+            self.model.embed_documents,
+            max_batch_size=settings.EMBEDDING_SERVICE_BATCH_SIZE,
+            max_wait_ms=settings.EMBEDDING_SERVICE_BATCH_WAIT_MS,
+        )
+
+    async def _dispatch(self, request: Dict) -> Dict:
+        op = request.get("op")
+        if op == "health":
+            return {"status": "ok", "model": EMBEDDING_MODEL_ID, "pid": os.getpid()}
+        if op == "embed":
+            texts = request.get("texts")
+            if not isinstance(texts, list):
+                return {"error": "'texts' must be a list of strings"}
+            embeddings = await self.batcher.embed_many([str(t) for t in texts])
+            return {"embeddings": [encode_embedding(e) for e in embeddings]}
+        return {"error": f"Unknown op: {op}"}
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request = await read_frame_async(reader)
+                if request is None:
+                    break
+                try:
+                    response = await self._dispatch(request)
+                except Exception as e:
+                    logger.error(f"Embedding request failed: {e}")
+                    response = {"error": str(e)}
+                writer.write(encode_frame(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        scheme, address = parse_service_url(self.url)
+        if scheme == "unix":
+            # A stale socket file from a previous run would make bind fail
+            if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+                os.unlink(address)
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path=address
+            )
+            os.chmod(address, 0o660)
+        else:
+            host, port = address
+            server = await asyncio.start_server(self.handle_connection, host, port)
+
+        logger.info(f"Embedding server for {EMBEDDING_MODEL_ID} on {self.url}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Shared local embedding server")
+    parser.add_argument(
+        "--url",
+        default=settings.EMBEDDING_SERVICE_URL or DEFAULT_SERVICE_URL,
+        help="unix:///path/to.sock or tcp://127.0.0.1:8765",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(EmbeddingServer(args.url).serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Client side of the shared local embedding service.
+
+When EMBEDDING_SERVICE_URL is set, API and Celery processes talk to a single
+embedding server (app.services.embeddings.server) instead of each loading its
+own copy of the model. Messages are length-prefixed JSON frames; embeddings
+travel as base64 float32 to keep frames small.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from langchain_core.embeddings import Embeddings
+
+from .cache import decode_embedding
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class EmbeddingServiceError(Exception):
+    """Raised when the embedding service rejects or fails a request."""
+
+
+def parse_service_url(url: str) -> Tuple[str, Any]:
+    """
+    Parse an embedding service URL.
+
+    Supports ``unix:///path/to/socket`` and ``tcp://host:port``.
+
+    Returns:
+        ("unix", path) or ("tcp", (host, port))
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return "unix", parsed.path
+    if parsed.scheme == "tcp":
+        return "tcp", (parsed.hostname or "127.0.0.1", parsed.port or 8765)
+    raise ValueError(f"Unsupported embedding service URL: {url}")
+
+
+def encode_frame(payload: Dict) -> bytes:
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+def decode_frame_length(header: bytes) -> int:
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise EmbeddingServiceError(f"Frame of {length} bytes exceeds limit")
+    return length
+
+
+async def read_frame_async(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Read one frame; returns None on a clean EOF."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    body = await reader.readexactly(decode_frame_length(header))
+    return json.loads(body)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        part = sock.recv(size - len(buf))
+        if not part:
+            raise ConnectionError("Embedding service closed the connection")
+        buf.extend(part)
+    return bytes(buf)
+
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Drop-in langchain Embeddings backed by the shared embedding service.
+
+    Sync calls keep one persistent connection per thread (and per process, so
+    forked Celery children never share a parent socket). Async calls use a
+    short-lived connection each, which is cheap over a Unix socket.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+        self.scheme, self.address = parse_service_url(url)
+        self._local = threading.local()
+
+    # Sync transport
+
+    def _connect(self) -> socket.socket:
+        family = socket.AF_UNIX if self.scheme == "unix" else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        return sock
+
+    def _get_socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None or getattr(self._local, "pid", None) != os.getpid():
+            sock = self._connect()
+            self._local.sock = sock
+            self._local.pid = os.getpid()
+        return sock
+
+    def _drop_socket(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _request(self, payload: Dict) -> Dict:
+        # Retry once: the server may have restarted since the socket was opened
+        for attempt in range(2):
+            try:
+                sock = self._get_socket()
+                sock.sendall(encode_frame(payload))
+                header = _recv_exactly(sock, FRAME_HEADER.size)
+                body = _recv_exactly(sock, decode_frame_length(header))
+                return self._unwrap(json.loads(body))
+            except (OSError, ConnectionError):
+                self._drop_socket()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    # Async transport
+
+    async def _arequest(self, payload: Dict) -> Dict:
+        if self.scheme == "unix":
+            connect = asyncio.open_unix_connection(self.address)
+        else:
+            connect = asyncio.open_connection(*self.address)
+        reader, writer = await asyncio.wait_for(connect, self.timeout)
+        try:
+            writer.write(encode_frame(payload))
+            await writer.drain()
+            response = await asyncio.wait_for(read_frame_async(reader), self.timeout)
+        finally:
+            writer.close()
+        if response is None:
+            raise ConnectionError("Embedding service closed the connection")
+        return self._unwrap(response)
+
+    @staticmethod
+    def _unwrap(response: Dict) -> Dict:
+        if "error" in response:
+            raise EmbeddingServiceError(response["error"])
+        return response
+
+    # Embeddings interface
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = self._request({"op": "embed", "texts": list(texts)})
+        return [decode_embedding(e) for e in response["embeddings"]]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = await self._arequest({"op": "embed", "texts": list(texts)})
+        return [decode_embedding(e) for e in response["embeddings"]]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def health(self) -> Dict:
+        """Model name and server pid, for readiness checks."""
+        return self._request({"op": "health"})
@@ -1,56 +1,284 @@
-from typing import List
+import time
+from typing import Callable, List, Optional
 
 from tqdm import tqdm
 
-from .model import EmbeddingModel
+from app.core.config import settings
+from app.services.ingestion.text_processor import text_processor
+
+from .batcher import EmbeddingBatcher
+from .batching import plan_batches
+from .cache import DocumentEmbeddingCache, QueryEmbeddingCache
+from .model import EMBEDDING_MODEL_ID, EmbeddingModel
+
+
+class EmbeddingError(RuntimeError):
+    """Document embedding failed beyond what skipping bad texts can absorb."""
 
 
 class EmbeddingTools:
     def __init__(self):
         self.embedding_model = EmbeddingModel.get_embedding_model()
+        self.query_cache = QueryEmbeddingCache(model_name=EMBEDDING_MODEL_ID)
+        self.document_cache = DocumentEmbeddingCache(model_name=EMBEDDING_MODEL_ID)
+        # Async callers share one micro-batching executor so concurrent chat
+        # turns are embedded together off the event loop.
+        self.query_batcher = EmbeddingBatcher(
+            self.embedding_model.embed_documents,
+            max_batch_size=settings.EMBEDDING_QUERY_BATCH_SIZE,
+            max_wait_ms=settings.EMBEDDING_QUERY_BATCH_WAIT_MS,
+            max_workers=settings.EMBEDDING_QUERY_WORKERS,
+        )
+
+    def _embed_query_uncached(self, query: str) -> List[float]:
+        try:
+            return self.embedding_model.embed_query(query)
+        except Exception as e:
+            print(f"Error embedding query: {e}")
+            return []
 
-    def embed_query(cls, query: str) -> List[float]:
+    def embed_query(self, query: str) -> List[float]:
         """
         Embed a query string.
+
+        Sync callers only see the in-process cache tier; async callers should
+        prefer aembed_query, which also consults Redis.
+        """
+        key = self.query_cache.key(query)
+        cached = self.query_cache.get_local(key)
+        if cached is not None:
+            return cached
+
+        query_embedding = self._embed_query_uncached(query)
+        if query_embedding:
+            self.query_cache.set_local(key, query_embedding)
+
+        return query_embedding
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """
+        Embed a query string without blocking the event loop.
+
+        Goes through the in-process and Redis cache tiers first; misses are
+        micro-batched with other concurrent queries on the executor.
         """
+        key = self.query_cache.key(query)
+        cached = await self.query_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            model = cls.embedding_model
-            query_embedding = model.embed_query(query)
+            query_embedding = await self.query_batcher.embed(query)
         except Exception as e:
             print(f"Error embedding query: {e}")
             return []
 
+        if query_embedding:
+            await self.query_cache.set(key, query_embedding)
+
         return query_embedding
 
-    def embed_document(cls, text_document: List[str]) -> List[List[float]]:
+    def _embed_bisect(
+        self,
+        texts: List[str],
+        indices: List[int],
+        skipped: List[int],
+        error: Exception,
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed a batch that failed as a whole by retrying each half.
+
+        Halves that fail again are split further until the texts that fail
+        on their own are isolated; those get None and their indices are
+        appended to `skipped`.
+        """
+        if len(texts) == 1:
+            print(f"Skipping text {indices[0]} that failed to embed: {error}")
+            skipped.append(indices[0])
+            return [None]
+
+        mid = len(texts) // 2
+        results: List[Optional[List[float]]] = []
+        for part, part_indices in (
+            (texts[:mid], indices[:mid]),
+            (texts[mid:], indices[mid:]),
+        ):
+            try:
+                part_embeddings = self.embedding_model.embed_documents(part)
+                if len(part_embeddings) != len(part):
+                    raise RuntimeError(
+                        f"Got {len(part_embeddings)} embeddings for {len(part)} texts"
+                    )
+            except Exception as e:
+                part_embeddings = self._embed_bisect(part, part_indices, skipped, e)
+            results.extend(part_embeddings)
+        return results
+
+    def embed_document(
+        cls,
+        text_document: List[str],
+        token_budget: int = settings.EMBEDDING_BATCH_TOKEN_BUDGET,
+        max_batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+        skip_failures: bool = False,
+        max_skipped: int = settings.EMBEDDING_MAX_SKIPPED,
+        on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None,
+    ) -> List[Optional[List[float]]]:
         """
-        Embed the document list
+        Embed the document list.
+
+        Texts are sorted by token length and grouped into batches under a
+        padded-token budget, so short Q&A pairs are not padded out to the
+        longest chunk; embeddings are returned in the original order.
+
+        With skip_failures, a batch that raises is bisected to isolate the
+        texts that cannot be embedded; those come back as None instead of
+        the whole job being dropped.
+
+        Args:
+            text_document: Texts to embed
+            token_budget: Max padded tokens (longest text x count) per batch
+            max_batch_size: Max texts per batch
+            skip_failures: Bisect failed batches and skip the bad texts
+            max_skipped: With skip_failures, give up once more texts than
+                this have failed (a broken model, not a bad input)
+            on_batch: Called with (texts, embeddings) after every batch, e.g.
+                to checkpoint progress
+
+        Returns:
+            One embedding (or None if skipped) per text, or [] if a batch
+            failed without skip_failures
+
+        Raises:
+            EmbeddingError: If more than max_skipped texts failed
         """
         if not text_document:
             return []
 
         model = cls.embedding_model
-        embeddings = []
+        lengths = text_processor.count_tokens_batch(text_document)
+        batches = plan_batches(lengths, token_budget, max_batch_size)
+        embeddings: List[Optional[List[float]]] = [None] * len(text_document)
+        skipped: List[int] = []
 
-        batch_size = 500
-        for i in tqdm(
-            range(0, len(text_document), batch_size),
+        total_tokens = 0
+        started = time.perf_counter()
+        progress = tqdm(
+            batches,
             desc="Processing",
             unit="batch",
-            bar_format="{l_bar}{bar} | {n_fmt}/{total_fmt} batches embedded",
-            ncols=100,
+            bar_format="{l_bar}{bar} | {n_fmt}/{total_fmt} batches embedded{postfix}",
+            ncols=120,
             leave=False,
-        ):
-            batch = text_document[i : i + batch_size]
+        )
+        for batch_number, batch in enumerate(progress):
+            batch_texts = [text_document[i] for i in batch]
+            batch_started = time.perf_counter()
             try:
-                batch_embeddings = model.embed_documents(batch)
-                embeddings.extend(batch_embeddings)
+                batch_embeddings = model.embed_documents(batch_texts)
             except Exception as e:
-                print(f"Error embedding batch {i//batch_size}: {e}")
-                return []
+                print(f"Error embedding batch {batch_number}: {e}")
+                if not skip_failures:
+                    return []
+                batch_embeddings = cls._embed_bisect(batch_texts, batch, skipped, e)
+                if len(skipped) > max_skipped:
+                    raise EmbeddingError(
+                        f"{len(skipped)} texts failed to embed, giving up"
+                    ) from e
+
+            elapsed = max(time.perf_counter() - batch_started, 1e-9)
+            batch_tokens = sum(lengths[i] for i in batch)
+            total_tokens += batch_tokens
+            progress.set_postfix_str(
+                f"{len(batch)} texts, {len(batch) / elapsed:.0f} texts/s, "
+                f"{batch_tokens / elapsed:.0f} tok/s"
+            )
+            for index, embedding in zip(batch, batch_embeddings):
+                embeddings[index] = embedding
 
-        print(f"Embedded total {len(embeddings)} documents!")
+            if on_batch is not None:
+                done = [
+                    (text, embedding)
+                    for text, embedding in zip(batch_texts, batch_embeddings)
+                    if embedding is not None
+                ]
+                on_batch([t for t, _ in done], [e for _, e in done])
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(
+            f"Embedded total {len(embeddings) - len(skipped)} documents in "
+            f"{len(batches)} batches ({len(embeddings) / elapsed:.1f} docs/s, "
+            f"{total_tokens / elapsed:.0f} tok/s)"
+            + (f", skipped {len(skipped)}" if skipped else "")
+        )
         return embeddings
 
+    def embed_documents_cached(
+        self, texts: List[str], max_skipped: int = settings.EMBEDDING_MAX_SKIPPED
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed texts through the content-addressed document cache.
+
+        Looks all texts up in bulk and embeds only the misses (each distinct
+        text once). Every finished batch is written to the cache right away,
+        so the cache doubles as a checkpoint: a retried ingestion task skips
+        straight past everything embedded before it failed.
+
+        Texts that fail to embed on their own are skipped and come back as
+        None.
+
+        Args:
+            texts: Texts to embed
+            max_skipped: Give up once more misses than this have failed
+
+        Raises:
+            EmbeddingError: If the misses could not be embedded
+        """
+        embeddings = self.document_cache.get_many(texts)
+
+        # One representative text per distinct cache key among the misses
+        keys = [self.document_cache.key(text) for text in texts]
+        to_embed: dict[str, str] = {}
+        for key, text, embedding in zip(keys, texts, embeddings):
+            if embedding is None:
+                to_embed.setdefault(key, text)
+        if not to_embed:
+            return embeddings
+
+        miss_texts = list(to_embed.values())
+        new_embeddings = self.embed_document(
+            miss_texts,
+            skip_failures=True,
+            max_skipped=max_skipped,
+            on_batch=self.document_cache.set_many,
+        )
+        if len(new_embeddings) != len(miss_texts):
+            raise EmbeddingError(
+                f"Embedded {len(new_embeddings)} of {len(miss_texts)} new chunks"
+            )
+        print(
+            f"Embedding cache: {len(texts) - len(miss_texts)} reused, "
+            f"{len(miss_texts)} embedded"
+        )
+
+        by_key = dict(zip(to_embed.keys(), new_embeddings))
+        return [
+            embedding if embedding is not None else by_key[key]
+            for key, embedding in zip(keys, embeddings)
+        ]
+
+
+_embedding_tools: Optional[EmbeddingTools] = None
+
+
+def get_embedding_tools() -> EmbeddingTools:
+    """
+    Get or create the singleton EmbeddingTools, loading the model on first use.
+
+    Nothing is loaded at import, so the Celery parent importing the task
+    modules does not load the model; see app/tasks/worker_bootstrap.py.
+    """
+    global _embedding_tools
 
-embedding_tools = EmbeddingTools()
+    if _embedding_tools is None:
+        _embedding_tools = EmbeddingTools()
+    return _embedding_tools
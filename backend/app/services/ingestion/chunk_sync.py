@@ -0,0 +1,203 @@
+"""Incremental re-ingestion: diff a module's new chunks against stored ones."""
+
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.documents import Document
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.models.knowledge import KnowledgeChunk, KnowledgeModule
+from app.services.ingestion.chunk_writer import copy_chunks
+from app.services.ingestion.text_processor import content_hash
+
+# Returns one embedding per text, None for texts that could not be embedded
+EmbedFn = Callable[[List[str]], List[Optional[List[float]]]]
+
+
+class IngestionAborted(Exception):
+    """Raised by sync_module_chunks when should_abort() turns true."""
+
+
+# Chunks embedded and written per COPY
+INSERT_BATCH_SIZE = 256
+# Ids per DELETE statement
+DELETE_BATCH_SIZE = 1000
+
+
+def _insert_chunks(
+    db: Session,
+    module: KnowledgeModule,
+    pending: List[Tuple[int, Document, str]],
+    embed_fn: EmbedFn,
+) -> int:
+    """
+    Embed and insert new chunks (index, document, hash).
+
+    Returns:
+        Number of chunks skipped because they could not be embedded
+    """
+    texts = [chunk.page_content for _, chunk, _ in pending]
+    embeddings = embed_fn(texts)
+    if len(embeddings) != len(texts):
+        raise RuntimeError(f"Embedded {len(embeddings)} of {len(texts)} chunks")
+
+    rows = []
+    skipped = 0
+    for (index, chunk, chunk_hash), embedding in zip(pending, embeddings):
+        if embedding is None:
+            # Left out; the next re-ingestion of the module retries it
+            skipped += 1
+            continue
+        metadata = {
+            k: v
+            for k, v in chunk.metadata.items()
+            if k not in ("token_count", "chunk_index", "module_id", "created_at")
+        }
+        metadata["source_type"] = module.module_type
+        rows.append(
+            {
+                "module_id": module.id,
+                "chunk_text": chunk.page_content,
+                "chunk_index": index,
+                "embedding": embedding,
+                "token_count": chunk.metadata.get("token_count"),
+                "chunk_metadata": metadata,
+                "content_hash": chunk_hash,
+            }
+        )
+
+    # Binary COPY in the session's transaction; rows never enter the ORM
+    copy_chunks(db, rows)
+    return skipped
+
+
+def _stored_chunks(
+    db: Session, module: KnowledgeModule
+) -> Tuple[Dict[str, Deque[Tuple[UUID, int]]], List[UUID]]:
+    """
+    The module's stored chunks, split by whether they can be reused.
+
+    Returns:
+        (hash -> queue of (id, chunk_index) in index order, ids of legacy
+        rows without a hash)
+    """
+    existing = (
+        db.query(
+            KnowledgeChunk.id, KnowledgeChunk.content_hash, KnowledgeChunk.chunk_index
+        )
+        .filter(KnowledgeChunk.module_id == module.id)
+        .order_by(KnowledgeChunk.chunk_index)
+        .all()
+    )
+
+    # Duplicate texts within a module are matched one-to-one, in order
+    reusable: Dict[str, Deque[Tuple[UUID, int]]] = defaultdict(deque)
+    stale_ids: List[UUID] = []
+    for chunk_id, chunk_hash, chunk_index in existing:
+        if chunk_hash:
+            reusable[chunk_hash].append((chunk_id, chunk_index))
+        else:
+            stale_ids.append(chunk_id)
+    return reusable, stale_ids
+
+
+def _flush_batch(
+    db: Session,
+    module: KnowledgeModule,
+    pending: List[Tuple[int, Document, str]],
+    embed_fn: EmbedFn,
+    stats: Dict[str, int],
+    should_abort: Optional[Callable[[], bool]],
+) -> None:
+    """Check for an abort, then embed and insert a batch, updating stats."""
+    if should_abort is not None and should_abort():
+        raise IngestionAborted(f"Ingestion of module {module.id} aborted")
+    skipped = _insert_chunks(db, module, pending, embed_fn)
+    stats["inserted"] += len(pending) - skipped
+    stats["skipped"] += skipped
+
+
+def sync_module_chunks(
+    db: Session,
+    module: KnowledgeModule,
+    chunks: Iterable[Document],
+    embed_fn: EmbedFn,
+    batch_size: int = INSERT_BATCH_SIZE,
+    should_abort: Optional[Callable[[], bool]] = None,
+) -> Dict[str, int]:
+    """
+    Make the module's stored chunks match `chunks`, touching only what changed.
+
+    Every chunk is identified by the hash of its text. Stored chunks whose hash
+    still appears are kept (with their embedding) and renumbered to their new
+    position; new hashes are embedded and inserted; stored chunks whose hash no
+    longer appears, including legacy rows without a hash, are deleted.
+
+    `chunks` is consumed lazily and new chunks are written in batches, so
+    memory stays bounded by batch_size regardless of the document's size.
+    Everything happens in the session's current transaction; the caller
+    commits or rolls back, so readers never see a half-updated module.
+
+    Args:
+        db: Sync database session
+        module: Module being re-ingested
+        chunks: New chunks in order, each with metadata["token_count"]
+        embed_fn: Embeds a list of texts (only called for new chunks); a
+            None embedding skips that chunk
+        batch_size: New chunks embedded and inserted per batch
+        should_abort: Checked before each batch is embedded; returning True
+            raises IngestionAborted (the caller should roll back)
+
+    Returns:
+        Dict with 'kept', 'inserted', 'skipped', 'deleted', 'renumbered',
+        'total_tokens'
+
+    Raises:
+        IngestionAborted: If should_abort() returned True
+    """
+    reusable, stale_ids = _stored_chunks(db, module)
+
+    renumbered: List[Dict] = []
+    pending: List[Tuple[int, Document, str]] = []
+    stats = {"kept": 0, "inserted": 0, "skipped": 0, "deleted": 0, "renumbered": 0}
+    total_tokens = 0
+
+    for index, chunk in enumerate(chunks):
+        total_tokens += chunk.metadata.get("token_count") or 0
+        chunk_hash = content_hash(chunk.page_content)
+
+        if reusable.get(chunk_hash):
+            chunk_id, old_index = reusable[chunk_hash].popleft()
+            stats["kept"] += 1
+            if old_index != index:
+                renumbered.append({"id": chunk_id, "chunk_index": index})
+            continue
+
+        pending.append((index, chunk, chunk_hash))
+        if len(pending) >= batch_size:
+            _flush_batch(db, module, pending, embed_fn, stats, should_abort)
+            pending = []
+
+    if pending:
+        _flush_batch(db, module, pending, embed_fn, stats, should_abort)
+
+    for leftovers in reusable.values():
+        stale_ids.extend(chunk_id for chunk_id, _ in leftovers)
+
+    for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+        db.execute(
+            delete(KnowledgeChunk).where(
+                KnowledgeChunk.id.in_(stale_ids[start : start + DELETE_BATCH_SIZE])
+            )
+        )
+    stats["deleted"] = len(stale_ids)
+
+    if renumbered:
+        # Bulk UPDATE by primary key
+        db.execute(update(KnowledgeChunk), renumbered)
+    stats["renumbered"] = len(renumbered)
+
+    stats["total_tokens"] = total_tokens
+    return stats
@@ -0,0 +1,124 @@
+"""
+Bulk writer for knowledge_chunks using binary COPY.
+
+Rows are encoded in PostgreSQL's binary COPY format, including pgvector's
+binary representation of the embedding, and streamed through the session's
+own psycopg2 connection. Writing therefore joins the session's transaction:
+a module's chunks land together on commit or not at all.
+"""
+
+import io
+import json
+import struct
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.knowledge import KnowledgeChunk
+
+# Columns written by COPY; created_at is left to its server default
+COPY_COLUMNS = (
+    "id",
+    "module_id",
+    "chunk_text",
+    "chunk_index",
+    "embedding",
+    "token_count",
+    "chunk_metadata",
+    "content_hash",
+)
+
+_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+_FIELD_COUNT = struct.pack(">h", len(COPY_COLUMNS))
+# jsonb binary format version
+_JSONB_VERSION = b"\x01"
+
+
+def _field(payload: Optional[bytes]) -> bytes:
+    if payload is None:
+        return _NULL
+    return struct.pack(">i", len(payload)) + payload
+
+
+def _uuid(value: Any) -> bytes:
+    return (value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))).bytes
+
+
+def _text(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    # Postgres text cannot hold NUL; extracted PDF text occasionally does
+    return value.replace("\x00", "").encode("utf-8")
+
+
+def _int4(value: Optional[int]) -> Optional[bytes]:
+    return None if value is None else struct.pack(">i", value)
+
+
+def _vector(values: Optional[List[float]]) -> Optional[bytes]:
+    """pgvector binary format: int16 dim, int16 unused, dim x float4."""
+    if values is None:
+        return None
+    dim = len(values)
+    return struct.pack(f">hh{dim}f", dim, 0, *values)
+
+
+def _jsonb(value: Optional[Dict]) -> Optional[bytes]:
+    if value is None:
+        return None
+    return _JSONB_VERSION + json.dumps(value, default=str).encode("utf-8")
+
+
+def encode_row(row: Dict[str, Any]) -> bytes:
+    """Encode one knowledge_chunks row (keys as in COPY_COLUMNS)."""
+    return b"".join(
+        (
+            _FIELD_COUNT,
+            _field(_uuid(row.get("id") or uuid.uuid4())),
+            _field(_uuid(row["module_id"])),
+            _field(_text(row["chunk_text"])),
+            _field(_int4(row["chunk_index"])),
+            _field(_vector(row.get("embedding"))),
+            _field(_int4(row.get("token_count"))),
+            _field(_jsonb(row.get("chunk_metadata"))),
+            _field(_text(row.get("content_hash"))),
+        )
+    )
+
+
+def copy_chunks(db: Session, rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write chunk rows with a single binary COPY in the session's transaction.
+
+    Args:
+        db: Sync database session (bound to sync_engine)
+        rows: Dicts keyed by COPY_COLUMNS; 'id' is generated when missing
+
+    Returns:
+        Number of rows written
+    """
+    buffer = io.BytesIO()
+    buffer.write(_HEADER)
+    count = 0
+    for row in rows:
+        buffer.write(encode_row(row))
+        count += 1
+    buffer.write(_TRAILER)
+
+    if not count:
+        return 0
+
+    buffer.seek(0)
+    # Flush pending ORM changes so COPY sees the same transaction state
+    db.flush()
+    dbapi_connection = db.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {KnowledgeChunk.__tablename__} ({', '.join(COPY_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT binary)",
+            buffer,
+        )
+    return count
@@ -1,55 +1,389 @@
-from typing import List
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
 from langchain_community.document_loaders import (
-    PyPDFLoader,
     UnstructuredWordDocumentLoader,
-    CSVLoader,
     UnstructuredExcelLoader,
 )
 from langchain_core.documents import Document
+from pypdf import PdfReader
 
+from app.core.config import settings
 from app.core.storage import get_s3_client
+from app.services.ingestion.pdf_extract import (
+    extract_page_range,
+    iter_page_objects,
+    limit_memory,
+)
+from app.services.ingestion.tabular_parser import (
+    iter_csv_documents,
+    iter_xlsx_documents,
+)
+from app.services.ingestion.text_artifact import (
+    has_text_artifact,
+    load_text_artifact,
+    write_text_artifact,
+)
+from app.services.ingestion.uploads import DOCUMENT_EXTENSIONS
+
+
+# Formats whose parsers read file objects, so they are parsed straight from
+# the download buffer instead of a named temp file
+BUFFERED_EXTENSIONS = {".pdf", ".csv", ".xlsx"}
+
 
+def _parse_file(
+    source: Union[str, BinaryIO], ext: str, filename: str
+) -> Iterator[Document]:
+    """Parse a downloaded file lazily with the loader for its extension."""
+    # Tabular files are streamed in row groups with header context
+    if ext == ".csv":
+        return iter_csv_documents(source, title=filename)
+    if ext == ".xlsx":
+        return iter_xlsx_documents(source, title=filename)
+    if ext == ".pdf":
+        return (
+            Document(page_content=text, metadata={"page": page_number})
+            for page_number, text in extract_pdf_pages(source)
+        )
+    # Unstructured loaders only take paths (see BUFFERED_EXTENSIONS)
+    if ext in [".doc", ".docx"]:
+        return UnstructuredWordDocumentLoader(source).lazy_load()
+    # Legacy binary .xls; openpyxl cannot read it
+    return UnstructuredExcelLoader(source).lazy_load()
 
-def load_document(file_storage_key: str) -> List[Document]:
+
+def iter_document(file_storage_key: str) -> Iterator[Document]:
     """
-    Load a document from S3 storage using the appropriate loader based on file extension.
+    Lazily load a document from S3 storage, one page/element at a time.
+
+    If an extracted-text artifact exists for the current version of the
+    upload, it is streamed instead, skipping both the download and the parse.
+    Otherwise the file is downloaded and parsed, and the artifact is written
+    once parsing completes.
+
+    PDF, CSV and .xlsx files are parsed from an in-memory download buffer
+    (spilling to disk when large); Word and .xls files need a named temp
+    file. Either lives only while the generator is being consumed, and pages
+    are parsed on demand, so callers can stream large documents without
+    holding all of their text in memory.
 
     Args:
         file_storage_key: S3 key/path to the file in storage
 
-    Returns:
-        List of Document objects
+    Yields:
+        Document objects, in document order
     """
     ext = Path(file_storage_key).suffix.lower()
 
-    if ext not in [".pdf", ".doc", ".docx", ".csv", ".xls", ".xlsx"]:
+    if ext not in DOCUMENT_EXTENSIONS:
         raise ValueError(f"Unsupported file type: {ext}")
 
     s3_client = get_s3_client()
+    filename = Path(file_storage_key).name
 
     try:
-        with s3_client.download_to_temp(file_storage_key, suffix=ext) as temp_path:
-            if ext == ".pdf":
-                loader = PyPDFLoader(temp_path)
-            elif ext in [".doc", ".docx"]:
-                loader = UnstructuredWordDocumentLoader(temp_path)
-            elif ext == ".csv":
-                loader = CSVLoader(temp_path)
-            elif ext in [".xls", ".xlsx"]:
-                loader = UnstructuredExcelLoader(temp_path)
-
-            docs = loader.load()
-
-            filename = Path(file_storage_key).name
-            for doc in docs:
+        etag = s3_client.get_etag(file_storage_key)
+        cached = load_text_artifact(s3_client, file_storage_key, etag)
+        if cached is not None:
+            print(f"Using extracted text artifact for {file_storage_key}")
+            for doc in cached:
                 doc.metadata["source"] = filename
                 doc.metadata["storage_key"] = file_storage_key
+                yield doc
+            return
 
-            return docs
+        if ext in BUFFERED_EXTENSIONS:
+            download = s3_client.download_to_buffer(file_storage_key)
+        else:
+            download = s3_client.download_to_temp(file_storage_key, suffix=ext)
+
+        with download as source:
+            docs = write_text_artifact(
+                s3_client,
+                file_storage_key,
+                etag,
+                _parse_file(source, ext, filename),
+            )
+            for doc in docs:
+                doc.metadata["source"] = filename
+                doc.metadata["storage_key"] = file_storage_key
+                yield doc
 
     except ValueError:
         raise
     except Exception as e:
         raise Exception(f"Error loading file {file_storage_key}: {str(e)}")
+
+
+@contextmanager
+def _local_path(source: Union[str, BinaryIO]) -> Iterator[str]:
+    """Yield a path for source, copying a file object to a temp file."""
+    if isinstance(source, str):
+        yield source
+        return
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    try:
+        with temp_file:
+            source.seek(0)
+            shutil.copyfileobj(source, temp_file)
+        yield temp_file.name
+    finally:
+        os.unlink(temp_file.name)
+
+
+# Extraction pool shared by every PDF this process parses, created on first
+# use. The CPUs are divided between the processes that may each run one: a
+# Celery prefork child gets cpu_count // concurrency extractors, the same
+# share its torch threads get (see app/tasks/worker_bootstrap.py).
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_cpu_sharers = 1
+
+
+def configure_pdf_pool(sharers: int) -> None:
+    """Divide the CPUs between `sharers` extraction pools (one per child)."""
+    global _cpu_sharers
+    _cpu_sharers = max(1, sharers)
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the shared extraction pool (process shutdown)."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def _in_billiard_child() -> bool:
+    """
+    True in a Celery prefork pool child.
+
+    Pool children are billiard processes; stdlib multiprocessing sees them
+    as a main process, so its daemon flag never says so.
+    """
+    try:
+        from billiard.process import current_process
+    except ImportError:
+        return False
+    return bool(current_process().daemon)
+
+
+def _default_pdf_workers() -> int:
+    """This process's share of the CPUs for extraction."""
+    workers = (os.cpu_count() or 1) // _cpu_sharers
+    if _cpu_sharers == 1 and _in_billiard_child():
+        # A Celery child whose bootstrap did not say how many siblings it
+        # has: do not assume the whole machine
+        return 1
+    return max(1, workers)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            # Spawned workers only import pypdf; forking a Celery child would
+            # copy its embedding model and threads into every worker
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=limit_memory,
+            initargs=(settings.INGESTION_PDF_WORKER_MEMORY_MB * 1024 * 1024,),
+            max_tasks_per_child=settings.INGESTION_PDF_WORKER_MAX_TASKS,
+        )
+        _pool_workers = workers
+    return _pool
+
+
+def extract_pdf_pages(
+    source: Union[str, BinaryIO],
+    start: int = 0,
+    end: Optional[int] = None,
+    workers: int = settings.INGESTION_PDF_WORKERS,
+    pages_per_job: int = settings.INGESTION_PDF_PAGES_PER_JOB,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Extract page texts of a PDF, in parallel for large page counts.
+
+    Page ranges are fanned out over this process's shared, spawned process
+    pool, whose workers have a capped address space and are recycled
+    periodically; pages are yielded in order as their range finishes, with
+    a bounded number of ranges in flight. Small documents, and callers that
+    cannot have child processes (daemonic multiprocessing workers), extract
+    serially from one reader. A file object is copied to a temp file only
+    when the pool is used.
+
+    Args:
+        source: Local PDF path or seekable file object
+        start: First page (0-based, inclusive)
+        end: Last page (exclusive); defaults to the end of the document
+        workers: Pool size; 0 means this process's share of the CPUs
+        pages_per_job: Pages extracted per pool job
+
+    Yields:
+        (page_number, text) pairs in page order
+    """
+    reader = PdfReader(source)
+    page_count = len(reader.pages)
+    end = page_count if end is None else min(end, page_count)
+    workers = workers or _default_pdf_workers()
+    ranges = [
+        (first, min(first + pages_per_job, end))
+        for first in range(start, end, pages_per_job)
+    ]
+
+    if (
+        workers <= 1
+        or len(ranges) <= 1
+        or end - start < settings.INGESTION_PDF_PARALLEL_MIN_PAGES
+        or multiprocessing.current_process().daemon
+    ):
+        # Same plain extraction as extract_page_range
+        for page_number in range(start, end):
+            yield page_number, reader.pages[page_number].extract_text()
+        return
+
+    # Pool workers open the file themselves; free the parent's parse
+    del reader
+    with _local_path(source) as path:
+        yield from _extract_in_pool(path, ranges, workers)
+
+
+def _extract_in_pool(
+    path: str, ranges: List[Tuple[int, int]], workers: int
+) -> Iterator[Tuple[int, str]]:
+    pool = _get_pool(workers)
+    # The pool may be shared at a different size; keep its workers busy
+    in_flight_limit = 2 * _pool_workers
+    remaining = iter(ranges)
+    in_flight = deque(
+        pool.submit(extract_page_range, path, first, last)
+        for first, last in islice(remaining, in_flight_limit)
+    )
+    try:
+        while in_flight:
+            pages = in_flight.popleft().result()
+            next_range = next(remaining, None)
+            if next_range is not None:
+                in_flight.append(pool.submit(extract_page_range, path, *next_range))
+            yield from pages
+    except BrokenProcessPool:
+        # A worker died (e.g. hit its memory cap); start afresh next time
+        shutdown_pdf_pool()
+        raise
+    finally:
+        # Stopped early or failed: drop queued ranges, wait out running ones
+        # (they read the temp file the caller is about to delete)
+        for future in in_flight:
+            future.cancel()
+        wait(in_flight)
+
+
+def has_extracted_text(file_storage_key: str) -> bool:
+    """True if iter_document would be served from an extracted-text artifact."""
+    s3_client = get_s3_client()
+    etag = s3_client.get_etag(file_storage_key)
+    return has_text_artifact(s3_client, file_storage_key, etag)
+
+
+def count_pdf_pages(file_storage_key: str) -> int:
+    """
+    Count the pages of a PDF in S3 storage without extracting any text.
+
+    Reads the page tree root's /Count through ranged GETs, fetching only the
+    cross-reference data and a few objects rather than the whole file. The
+    reader is strict because lenient mode validates every cross-reference
+    entry, touching the whole file; PDFs that need repairs fall back to a
+    full download.
+
+    Args:
+        file_storage_key: S3 key/path to the PDF
+
+    Returns:
+        Number of pages
+    """
+    s3_client = get_s3_client()
+    try:
+        with s3_client.open_ranged(file_storage_key) as file:
+            reader = PdfReader(file, strict=True)
+            return int(reader.trailer["/Root"]["/Pages"]["/Count"])
+    except Exception as e:
+        print(f"Counting pages of {file_storage_key} from a full download: {e}")
+
+    with s3_client.download_to_buffer(file_storage_key) as buffer:
+        return len(PdfReader(buffer).pages)
+
+
+def iter_pdf_pages(
+    file_storage_key: str, start: int, end: Optional[int]
+) -> Iterator[Document]:
+    """
+    Lazily load pages [start, end) of a PDF in S3 storage.
+
+    Uses the same extraction as iter_document, so a page yields the same
+    chunks whether it is ingested in one task or in a fan-out range. Pages
+    are read through ranged GETs, so a fan-out subtask fetches the
+    cross-reference data and its own pages rather than the whole file.
+
+    Args:
+        file_storage_key: S3 key/path to the PDF
+        start: First page (0-based, inclusive)
+        end: Last page (exclusive); None for the end of the document
+
+    Yields:
+        One Document per page, in order
+    """
+    filename = Path(file_storage_key).name
+
+    try:
+        for page_number, text in _ranged_pdf_pages(file_storage_key, start, end):
+            yield Document(
+                page_content=text,
+                metadata={
+                    "source": filename,
+                    "storage_key": file_storage_key,
+                    "page": page_number,
+                },
+            )
+    except Exception as e:
+        raise Exception(
+            f"Error loading pages {start}-{end} of {file_storage_key}: {str(e)}"
+        )
+
+
+def _ranged_pdf_pages(
+    file_storage_key: str, start: int, end: Optional[int]
+) -> Iterator[Tuple[int, str]]:
+    """
+    Page texts over ranged GETs, read as by extract_page_range.
+
+    The reader is strict (see count_pdf_pages) and walks the page tree to
+    the range only (see iter_page_objects). A PDF either rejects is
+    downloaded in full and read from the first page not yet yielded.
+    """
+    s3_client = get_s3_client()
+    next_page = start
+    try:
+        with s3_client.open_ranged(file_storage_key) as file:
+            reader = PdfReader(file, strict=True)
+            for page_number, page in iter_page_objects(reader, start, end):
+                yield page_number, page.extract_text()
+                next_page = page_number + 1
+        return
+    except Exception as e:
+        print(f"Reading pages of {file_storage_key} from a full download: {e}")
+
+    with s3_client.download_to_buffer(file_storage_key) as buffer:
+        # Fan-out ranges already run in parallel across Celery workers
+        yield from extract_pdf_pages(buffer, next_page, end, workers=1)
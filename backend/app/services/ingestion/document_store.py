@@ -0,0 +1,358 @@
+"""
+Content-addressed storage for uploaded documents.
+
+An upload first lands at its staging key (see uploads.new_upload_key). On
+first processing the worker hashes it and moves it to content/<sha256><ext>,
+counting the reference in document_blobs; the staging object is then
+deleted. Modules that upload the same file therefore share one S3 object,
+one extracted-text artifact (artifacts are keyed by storage key), and, once
+one of them is processed, its chunks and embeddings.
+
+Claims, and deletions of objects whose blob row is gone, hold a transaction
+advisory lock on the content hash. An object is only deleted after its row's
+deletion has committed, and only if no claim has created the row again since.
+A claim therefore never points a module at an object about to be deleted, and
+a failed commit never leaves a module pointing at a deleted one. Modules
+removed without releasing their reference (the persona cascade), and objects
+a failed delete left behind, are caught up with by reconcile_document_blobs.
+"""
+
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.async_storage import AsyncS3Client
+from app.core.storage import S3Client
+from app.models.knowledge import (
+    DocumentBlob,
+    KnowledgeChunk,
+    KnowledgeModule,
+    ProcessingStatus,
+)
+from app.services.ingestion.text_artifact import artifact_prefix
+
+CONTENT_PREFIX = "content/"
+
+# Serialises claims of a content hash with deletions of its object
+CONTENT_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext(:content_hash))")
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def content_key(content_hash: str, ext: str) -> str:
+    """Shared storage key for a file's content."""
+    return f"{CONTENT_PREFIX}{content_hash}{ext}"
+
+
+def hash_object(s3_client: S3Client, key: str) -> Tuple[str, int]:
+    """
+    Stream an object from S3 and hash it.
+
+    Returns:
+        (sha256 hex digest, size in bytes)
+    """
+    body = s3_client.open_file(key)
+    if body is None:
+        raise Exception(f"File not found: {key}")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        for block in body.iter_chunks(HASH_BLOCK_SIZE):
+            digest.update(block)
+            size += len(block)
+    finally:
+        body.close()
+    return digest.hexdigest(), size
+
+
+def claim_document_blob(
+    db: Session, module: KnowledgeModule, s3_client: S3Client
+) -> str:
+    """
+    Move a module's uploaded file to content-addressed storage.
+
+    Does nothing for modules already claimed. Otherwise increments (or
+    creates) the blob's reference, makes sure the content object exists,
+    points the module at it and commits; the staging object is deleted
+    afterwards.
+
+    Args:
+        db: Sync database session
+        module: Document module
+        s3_client: Storage client
+
+    Returns:
+        The module's content hash
+    """
+    if module.content_hash:
+        return module.content_hash
+
+    staging_key = module.file_storage_key
+    digest, size = hash_object(s3_client, staging_key)
+    key = content_key(digest, Path(staging_key).suffix.lower())
+
+    # Locks the content and the blob row until commit. Content stored before
+    # under another extension keeps its key, so modules share one object.
+    db.execute(CONTENT_LOCK_SQL, {"content_hash": digest})
+    key = db.execute(
+        insert(DocumentBlob)
+        .values(content_hash=digest, storage_key=key, file_size=size, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[DocumentBlob.content_hash],
+            set_={"ref_count": DocumentBlob.ref_count + 1},
+        )
+        .returning(DocumentBlob.storage_key)
+    ).scalar_one()
+    if not s3_client.file_exists(key):
+        s3_client.copy_file(staging_key, key)
+
+    module.content_hash = digest
+    module.file_storage_key = key
+    db.commit()
+
+    if staging_key != key:
+        delete_document_files(s3_client, staging_key)
+
+    print(f"Module {module.id}: stored upload as {key}")
+    return digest
+
+
+def copy_twin_chunks(db: Session, module: KnowledgeModule) -> Optional[UUID]:
+    """
+    Give a module with no chunks yet the chunks of a processed twin.
+
+    A twin is another COMPLETED module with the same content hash; its
+    chunk texts and embeddings are copied as-is. Does not commit.
+
+    Returns:
+        The twin's id, or None if nothing was copied
+    """
+    if not module.content_hash:
+        return None
+
+    has_chunks = db.execute(
+        select(KnowledgeChunk.id).where(KnowledgeChunk.module_id == module.id).limit(1)
+    ).first()
+    if has_chunks:
+        return None
+
+    twin_id = db.execute(
+        select(KnowledgeModule.id)
+        .where(
+            KnowledgeModule.content_hash == module.content_hash,
+            KnowledgeModule.id != module.id,
+            KnowledgeModule.processing_status == ProcessingStatus.COMPLETED,
+        )
+        .order_by(KnowledgeModule.updated_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if twin_id is None:
+        return None
+
+    db.execute(
+        text(
+            """
+            INSERT INTO knowledge_chunks (
+                id, module_id, chunk_text, chunk_index, embedding, token_count,
+                chunk_metadata, content_hash
+            )
+            SELECT gen_random_uuid(), :module_id, chunk_text, chunk_index,
+                embedding, token_count, chunk_metadata, content_hash
+            FROM knowledge_chunks
+            WHERE module_id = :twin_id
+            """
+        ),
+        {"module_id": module.id, "twin_id": twin_id},
+    )
+    return twin_id
+
+
+def delete_document_files(s3_client: S3Client, file_storage_key: str) -> None:
+    """Delete an uploaded file and its extracted-text artifacts; best effort."""
+    try:
+        s3_client.delete_file(file_storage_key)
+        s3_client.delete_prefix(artifact_prefix(file_storage_key))
+    except Exception as e:
+        print(f"Failed to delete document {file_storage_key}: {e}")
+
+
+async def delete_document_files_async(
+    s3_client: AsyncS3Client, file_storage_key: str
+) -> None:
+    """Async delete_document_files for the API process."""
+    try:
+        await asyncio.gather(
+            s3_client.delete_file(file_storage_key),
+            s3_client.delete_prefix(artifact_prefix(file_storage_key)),
+        )
+    except Exception as e:
+        print(f"Failed to delete document {file_storage_key}: {e}")
+
+
+async def delete_document_module(
+    db: AsyncSession, module: KnowledgeModule, s3_client: AsyncS3Client
+) -> None:
+    """
+    Delete a module and drop its blob reference in one transaction. Commits.
+
+    Shared uploads go when their last module does; an upload not yet moved
+    to shared storage belongs to this module alone. Files are deleted only
+    after the commit, so a failed commit never leaves a module pointing at
+    a missing object; what a failed delete leaves behind is removed by
+    reconcile_document_blobs.
+    """
+    content_hash = module.content_hash
+    file_storage_key = module.file_storage_key
+
+    # Flushed before the release, which may delete the blob row it references
+    await db.delete(module)
+    await db.flush()
+    released_key = None
+    if content_hash:
+        released_key = await release_document_blob(db, content_hash)
+    await db.commit()
+
+    if released_key:
+        await _delete_released_object(db, content_hash, released_key, s3_client)
+    elif not content_hash and file_storage_key:
+        await delete_document_files_async(s3_client, file_storage_key)
+
+
+async def _delete_released_object(
+    db: AsyncSession, content_hash: str, storage_key: str, s3_client: AsyncS3Client
+) -> None:
+    """Delete a released blob's files, unless a claim has tracked them again."""
+    await db.execute(CONTENT_LOCK_SQL, {"content_hash": content_hash})
+    tracked = (await db.execute(_tracking_blob(storage_key))).first()
+    if not tracked:
+        await delete_document_files_async(s3_client, storage_key)
+    await db.commit()
+
+
+def _tracking_blob(storage_key: str):
+    return select(DocumentBlob.content_hash).where(
+        DocumentBlob.storage_key == storage_key
+    )
+
+
+async def release_document_blob(db: AsyncSession, content_hash: str) -> Optional[str]:
+    """
+    Drop one reference to a blob, deleting the blob row at zero.
+
+    Does not commit: the caller commits together with the deletion of the
+    referencing module, which keeps the blob row locked until then, and
+    deletes the S3 object afterwards.
+
+    Returns:
+        Storage key of the object to delete once committed, if the blob
+        lost its last reference
+    """
+    result = await db.execute(
+        update(DocumentBlob)
+        .where(DocumentBlob.content_hash == content_hash)
+        .values(ref_count=DocumentBlob.ref_count - 1)
+        .returning(DocumentBlob.ref_count, DocumentBlob.storage_key)
+    )
+    row = result.first()
+    if row is None or row.ref_count > 0:
+        return None
+
+    await db.execute(
+        delete(DocumentBlob).where(DocumentBlob.content_hash == content_hash)
+    )
+    return row.storage_key
+
+
+def reconcile_document_blobs(db: Session, s3_client: S3Client) -> Tuple[int, int, int]:
+    """
+    Reset blob reference counts to the modules actually pointing at them,
+    then delete content objects no blob tracks.
+
+    Catches up with modules deleted without releasing their reference,
+    such as by the persona cascade. Each mismatched blob is re-counted with
+    its row locked, so it serialises with claims and releases; blobs left
+    with no modules are deleted. Their objects, and any a failed delete
+    left behind, are then found by listing content storage.
+
+    Args:
+        db: Sync database session
+        s3_client: Storage client
+
+    Returns:
+        (blobs whose count was corrected, blobs deleted, objects deleted)
+    """
+    referencing = (
+        select(func.count(KnowledgeModule.id))
+        .where(KnowledgeModule.content_hash == DocumentBlob.content_hash)
+        .scalar_subquery()
+    )
+    mismatched = (
+        db.execute(
+            select(DocumentBlob.content_hash).where(
+                DocumentBlob.ref_count != referencing
+            )
+        )
+        .scalars()
+        .all()
+    )
+    db.rollback()
+
+    corrected = deleted = 0
+    for content_hash in mismatched:
+        blob = db.execute(
+            select(DocumentBlob)
+            .where(DocumentBlob.content_hash == content_hash)
+            .with_for_update()
+        ).scalar_one_or_none()
+        # Counted after the lock, so claims and releases in flight are seen
+        ref_count = db.execute(
+            select(func.count(KnowledgeModule.id)).where(
+                KnowledgeModule.content_hash == content_hash
+            )
+        ).scalar_one()
+
+        if blob is None or blob.ref_count == ref_count:
+            pass
+        elif ref_count == 0:
+            db.delete(blob)
+            deleted += 1
+        else:
+            blob.ref_count = ref_count
+            corrected += 1
+        db.commit()
+
+    return corrected, deleted, _delete_untracked_objects(db, s3_client)
+
+
+def _delete_untracked_objects(db: Session, s3_client: S3Client) -> int:
+    """Delete content objects (and their artifacts) no blob row tracks."""
+    deleted = 0
+    for keys in s3_client.list_keys(CONTENT_PREFIX):
+        # Artifacts live under "<object key>.extracted/"
+        object_keys = {key.split(".extracted/", 1)[0] for key in keys}
+        tracked = set(
+            db.execute(
+                select(DocumentBlob.storage_key).where(
+                    DocumentBlob.storage_key.in_(object_keys)
+                )
+            ).scalars()
+        )
+        db.rollback()
+
+        for key in object_keys - tracked:
+            content_hash = Path(key).name[:64]
+            db.execute(CONTENT_LOCK_SQL, {"content_hash": content_hash})
+            if not db.execute(_tracking_blob(key)).first():
+                delete_document_files(s3_client, key)
+                deleted += 1
+            db.commit()
+
+    return deleted
@@ -0,0 +1,89 @@
+"""
+S3 staging for fanned-out PDF ingestion.
+
+Page-range subtasks write the chunks they embedded, and the pages they
+extracted, to gzipped JSON lines under a per-run prefix next to the upload's
+text artifacts, and return only keys and counts through the chord; the
+fan-in callback streams the chunks back in page order, joins the page parts
+into the text artifact and deletes the prefix. Document text never passes
+through the result backend. Anything left behind by a lost run is deleted
+with the upload.
+"""
+
+from typing import Iterable, Iterator, List
+from uuid import uuid4
+
+from langchain_core.documents import Document
+
+from app.core.storage import S3Client
+from app.services.ingestion.text_artifact import (
+    artifact_prefix,
+    iter_jsonl_gz,
+    page_record,
+    write_jsonl_gz,
+)
+
+
+def new_staging_prefix(file_storage_key: str) -> str:
+    """Folder for the staged subtask output of a new fan-out run."""
+    return f"{artifact_prefix(file_storage_key)}fanout-{uuid4().hex}/"
+
+
+def staged_chunks_key(prefix: str, start: int) -> str:
+    """Key of the chunks of the page range starting at `start`."""
+    return f"{prefix}chunks-{start:06d}.jsonl.gz"
+
+
+def staged_pages_key(prefix: str, start: int) -> str:
+    """Key of the extracted pages of the range starting at `start`."""
+    return f"{prefix}pages-{start:06d}.jsonl.gz"
+
+
+def write_staged_pages(s3_client: S3Client, key: str, pages: Iterable[Document]) -> int:
+    """
+    Stage extracted pages as a text artifact part (see store_text_artifact).
+
+    Returns:
+        Number of pages staged
+    """
+    return write_jsonl_gz(s3_client, key, (page_record(page) for page in pages))
+
+
+def write_staged_chunks(
+    s3_client: S3Client, key: str, chunks: Iterable[Document]
+) -> int:
+    """
+    Stage chunks (text and token_count) for the fan-in callback.
+
+    Returns:
+        Number of chunks staged
+    """
+    return write_jsonl_gz(
+        s3_client,
+        key,
+        (
+            {"text": chunk.page_content, "token_count": chunk.metadata["token_count"]}
+            for chunk in chunks
+        ),
+    )
+
+
+def read_staged_chunks(s3_client: S3Client, keys: List[str]) -> Iterator[Document]:
+    """Stream staged chunks back, in the order of `keys`."""
+    for key in keys:
+        body = s3_client.open_file(key)
+        if body is None:
+            raise Exception(f"Staged chunks not found: {key}")
+        for record in iter_jsonl_gz(body):
+            yield Document(
+                page_content=record["text"],
+                metadata={"token_count": record["token_count"]},
+            )
+
+
+def delete_staging(s3_client: S3Client, prefix: str) -> None:
+    """Delete a run's staged output; best effort."""
+    try:
+        s3_client.delete_prefix(prefix)
+    except Exception as e:
+        print(f"Failed to delete staged ingestion output {prefix}: {e}")
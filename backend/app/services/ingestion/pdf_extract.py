@@ -0,0 +1,121 @@
+"""
+Process-pool worker functions for PDF text extraction.
+
+Kept free of app imports (settings, langchain, models) so spawned pool
+processes start quickly: they only import pypdf.
+"""
+
+import resource
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pypdf import PageObject, PdfReader
+from pypdf.generic import DictionaryObject, IndirectObject, NameObject
+
+# Page attributes a page takes from its ancestors when it has none itself
+INHERITABLE_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+def limit_memory(max_bytes: int) -> None:
+    """Pool initializer: cap the worker's address space (Linux/macOS)."""
+    if max_bytes <= 0:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        max_bytes = min(max_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+
+
+def extract_page_range(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract the text of pages [start, end) of a local PDF.
+
+    Uses pypdf's default (plain) extraction, the same as PyPDFLoader.
+
+    Returns:
+        (page_number, text) pairs in page order
+    """
+    reader = PdfReader(path)
+    end = min(end, len(reader.pages))
+    return [(i, reader.pages[i].extract_text()) for i in range(start, end)]
+
+
+def iter_page_objects(
+    reader: PdfReader, start: int, end: Optional[int] = None
+) -> Iterator[Tuple[int, PageObject]]:
+    """
+    Pages [start, end) of a PDF, without resolving the rest of the page tree.
+
+    reader.pages resolves every page object in the document, which over
+    ranged reads touches most of the file. This descends the page tree
+    instead, skipping subtrees by their /Count. A node whose /Count equals
+    its number of kids is taken to hold pages only, and is indexed directly.
+
+    Args:
+        reader: PDF reader
+        start: First page (0-based, inclusive)
+        end: Last page (exclusive); None for the end of the document
+
+    Yields:
+        (page_number, page) pairs in page order
+
+    Raises:
+        ValueError: If the page tree does not match its /Count entries
+    """
+    root = reader.trailer["/Root"]["/Pages"].get_object()
+    end = int(root["/Count"]) if end is None else end
+    yield from _walk_page_tree(reader, root, None, {}, 0, start, end)
+
+
+def _walk_page_tree(
+    reader: PdfReader,
+    node: DictionaryObject,
+    reference: Optional[IndirectObject],
+    inherited: Dict[str, object],
+    first: int,
+    start: int,
+    end: int,
+) -> Iterator[Tuple[int, PageObject]]:
+    """Pages of `node`, whose first page is page number `first`."""
+    if _is_page(node):
+        page = PageObject(reader, reference)
+        page.update(node)
+        for name, value in inherited.items():
+            if name not in page:
+                page[NameObject(name)] = value
+        yield first, page
+        return
+
+    inherited = {
+        **inherited,
+        **{name: node[name] for name in INHERITABLE_PAGE_ATTRIBUTES if name in node},
+    }
+    kids = node["/Kids"]
+    if int(node["/Count"]) == len(kids):
+        # Every kid is a page: resolve only those in range
+        for index in range(max(start - first, 0), min(end - first, len(kids))):
+            kid = kids[index].get_object()
+            if not _is_page(kid):
+                raise ValueError("Page tree node /Count does not match its kids")
+            yield from _walk_page_tree(
+                reader, kid, _reference(kids[index]), inherited, first + index, 0, 1
+            )
+        return
+
+    for entry in kids:
+        if first >= end:
+            return
+        kid = entry.get_object()
+        count = 1 if _is_page(kid) else int(kid["/Count"])
+        if first + count > start:
+            yield from _walk_page_tree(
+                reader, kid, _reference(entry), inherited, first, start, end
+            )
+        first += count
+
+
+def _is_page(node: DictionaryObject) -> bool:
+    return node.get("/Type", "/Page" if "/Kids" not in node else "/Pages") == "/Page"
+
+
+def _reference(entry) -> Optional[IndirectObject]:
+    return entry if isinstance(entry, IndirectObject) else None
@@ -0,0 +1,184 @@
+"""
+Extracted-text artifacts for uploaded documents.
+
+After a document is parsed, its page texts are stored as gzipped JSON lines
+next to the original upload, keyed by the parser version and the upload's
+ETag. Re-processing the module streams the artifact back instead of
+downloading and parsing the original again. A new upload (new ETag) or a
+parser change (bump PARSER_VERSION) simply misses the old artifact.
+"""
+
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from app.core.storage import S3Client
+
+# Bump whenever extraction output changes (loaders, PDF text mode, tabular
+# rendering), so stale artifacts are not reused
+PARSER_VERSION = 1
+
+# Artifacts above this size spill from memory to a temp file while written
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def artifact_prefix(file_storage_key: str) -> str:
+    """Folder holding every artifact version for an upload."""
+    return f"{file_storage_key}.extracted/"
+
+
+def artifact_key(file_storage_key: str, etag: str) -> str:
+    return f"{artifact_prefix(file_storage_key)}p{PARSER_VERSION}-{etag}.jsonl.gz"
+
+
+def has_text_artifact(
+    s3_client: S3Client, file_storage_key: str, etag: Optional[str]
+) -> bool:
+    """True if an artifact exists for this upload version."""
+    if not etag:
+        return False
+    return s3_client.get_etag(artifact_key(file_storage_key, etag)) is not None
+
+
+def load_text_artifact(
+    s3_client: S3Client, file_storage_key: str, etag: Optional[str]
+) -> Optional[Iterator[Document]]:
+    """
+    Open the artifact for this upload version, if one exists.
+
+    Args:
+        s3_client: Storage client
+        file_storage_key: Key of the original upload
+        etag: Current ETag of the upload (None disables the cache)
+
+    Returns:
+        Lazy iterator over the cached page Documents, or None on a miss
+    """
+    if not etag:
+        return None
+    body = s3_client.open_file(artifact_key(file_storage_key, etag))
+    if body is None:
+        return None
+    return _read_pages(body)
+
+
+def _read_pages(body) -> Iterator[Document]:
+    for page in iter_jsonl_gz(body):
+        yield Document(page_content=page["text"], metadata=page["metadata"])
+
+
+def iter_jsonl_gz(body) -> Iterator[dict]:
+    """Stream records from a gzipped JSON lines object body."""
+    with gzip.GzipFile(fileobj=body, mode="rb") as stream:
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            yield json.loads(line)
+
+
+def page_record(doc: Document) -> dict:
+    """Artifact record of a page Document."""
+    return {"text": doc.page_content, "metadata": doc.metadata}
+
+
+def _encode_line(record: dict) -> bytes:
+    return json.dumps(record, default=str, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def write_jsonl_gz(s3_client: S3Client, key: str, records: Iterable[dict]) -> int:
+    """
+    Upload records as a gzipped JSON lines object.
+
+    Records are compressed into a spooled buffer as they are consumed, so
+    memory stays bounded by SPOOL_MAX_BYTES.
+
+    Returns:
+        Number of records written
+    """
+    count = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        with gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6) as stream:
+            for record in records:
+                stream.write(_encode_line(record))
+                count += 1
+        spool.seek(0)
+        s3_client.upload_fileobj(spool, key)
+    return count
+
+
+def write_text_artifact(
+    s3_client: S3Client,
+    file_storage_key: str,
+    etag: Optional[str],
+    docs: Iterable[Document],
+) -> Iterator[Document]:
+    """
+    Pass documents through while recording them into a new artifact.
+
+    The artifact is uploaded only once `docs` has been fully consumed, so an
+    interrupted parse never leaves a truncated artifact behind. Upload
+    failures are logged and otherwise ignored.
+
+    Args:
+        s3_client: Storage client
+        file_storage_key: Key of the original upload
+        etag: ETag of the upload that was parsed (None disables the cache)
+        docs: Parsed page Documents
+
+    Yields:
+        The same Documents, unchanged
+    """
+    if not etag:
+        yield from docs
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        with gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6) as stream:
+            for doc in docs:
+                stream.write(_encode_line(page_record(doc)))
+                yield doc
+
+        spool.seek(0)
+        key = artifact_key(file_storage_key, etag)
+        try:
+            s3_client.upload_fileobj(spool, key)
+        except Exception as e:
+            print(f"Failed to store extracted text for {file_storage_key}: {e}")
+
+
+def store_text_artifact(
+    s3_client: S3Client,
+    file_storage_key: str,
+    etag: Optional[str],
+    part_keys: List[str],
+) -> None:
+    """
+    Assemble an artifact from page parts written with write_jsonl_gz.
+
+    Concatenated gzip members form one valid gzip stream, so the parts are
+    copied in order as they are, without recompressing. Failures are logged
+    and otherwise ignored.
+
+    Args:
+        s3_client: Storage client
+        file_storage_key: Key of the original upload
+        etag: ETag of the upload that was parsed (None disables the cache)
+        part_keys: Keys of the gzipped page_record parts, in page order
+    """
+    if not etag:
+        return
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+            for key in part_keys:
+                body = s3_client.open_file(key)
+                if body is None:
+                    raise Exception(f"Artifact part not found: {key}")
+                shutil.copyfileobj(body, spool)
+            spool.seek(0)
+            s3_client.upload_fileobj(spool, artifact_key(file_storage_key, etag))
+    except Exception as e:
+        print(f"Failed to store extracted text for {file_storage_key}: {e}")
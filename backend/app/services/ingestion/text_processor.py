@@ -4,10 +4,47 @@ from langchain_core.documents import Document
 from app.core.config import settings
 
 
-from typing import List, Tuple
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+import hashlib
 import tiktoken
 
 
+def content_hash(text: str) -> str:
+    """Stable identity of a chunk's text, used to diff re-ingestions."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+SNAP_MODES = ("sentence", "paragraph")
+SENTENCE_ENDINGS = ".!?…。！？"
+# Characters the boundary checks read before and after a position
+BOUNDARY_LOOKBEHIND = 4
+BOUNDARY_LOOKAHEAD = 2
+
+
+def _check_snap(snap: Optional[str]) -> None:
+    if snap and snap not in SNAP_MODES:
+        raise ValueError(f"Unknown snap mode: {snap}")
+
+
+def _is_paragraph_boundary(text: str, pos: int) -> bool:
+    """True if a blank line ends at or starts right at pos."""
+    return "\n\n" in text[max(0, pos - 2) : pos + 2]
+
+
+def _is_sentence_boundary(text: str, pos: int) -> bool:
+    """True if pos follows sentence-ending punctuation and whitespace."""
+    if _is_paragraph_boundary(text, pos):
+        return True
+    before = text[max(0, pos - 4) : pos]
+    stripped = before.rstrip()
+    if not stripped or stripped[-1] not in SENTENCE_ENDINGS:
+        return False
+    # Require whitespace between the punctuation and the next chunk, so
+    # decimals ("3.14") and abbreviations glued to words are not split
+    return stripped != before or text[pos : pos + 1].isspace()
+
+
 class TextProcessor:
     """Handles text chunking and token counting."""
 
@@ -19,42 +56,181 @@ class TextProcessor:
         """Count tokens in text."""
         return len(self.encoding.encode(text))
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for many texts (tiktoken encodes them in parallel)."""
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def _offsets(self, tokens: List[int]) -> Tuple[str, List[int]]:
+        """
+        Decode tokens once, returning the text and each token's start offset.
+
+        For any str input, decode(encode(text)) == text, so the offsets index
+        straight into the source string. A token starting inside a multi-byte
+        character is mapped to that character's start.
+        """
+        return self.encoding.decode_with_offsets(tokens)
+
+    def _mid_char(self, token: int) -> bool:
+        """True if the token starts part-way through a multi-byte character."""
+        return 0x80 <= self.encoding.decode_single_token_bytes(token)[0] < 0xC0
+
+    def _window_end(
+        self,
+        text: str,
+        tokens: List[int],
+        offsets: List[int],
+        start: int,
+        chunk_size: int,
+        overlap: int,
+        snap: Optional[str],
+    ) -> int:
+        """
+        End token index (exclusive) of the window starting at `start`.
+
+        Callers guarantee more than chunk_size tokens from `start`. Without
+        snapping the end is start + chunk_size. With snapping it is pulled
+        back to the last sentence/paragraph boundary, but never below half a
+        chunk, so chunks stay reasonably full and always advance. Either way
+        the end lands on a character boundary: a token offset inside a
+        multi-byte character maps to that character's start, so ending there
+        would cut the chunk short of its token_count.
+        """
+        end = start + chunk_size
+        floor = start + max(overlap + 1, chunk_size // 2)
+
+        if snap:
+            is_boundary = (
+                _is_paragraph_boundary if snap == "paragraph" else _is_sentence_boundary
+            )
+            for candidate in range(end, floor - 1, -1):
+                if not self._mid_char(tokens[candidate]) and is_boundary(
+                    text, offsets[candidate]
+                ):
+                    return candidate
+
+        while end > floor and self._mid_char(tokens[end]):
+            end -= 1
+        return end
+
+    def _next_start(self, tokens: List[int], start: int, end: int, overlap: int) -> int:
+        """
+        Start of the window after [start, end): overlap tokens back, on a
+        character boundary, and always past `start`.
+        """
+        next_start = max(end - overlap, start + 1)
+        while next_start > start + 1 and self._mid_char(tokens[next_start]):
+            next_start -= 1
+        return next_start
+
     def chunk_text(
         self,
         text: str,
         chunk_size: int = settings.CHUNK_SIZE_TOKENS,
         overlap: int = settings.CHUNK_OVERLAP_TOKENS,
+        snap: Optional[str] = settings.CHUNK_SNAP_TO or None,
     ) -> List[Document]:
         """
         Split text into overlapping chunks.
 
+        Same windowing as iter_chunks (over a single text): the text is
+        encoded and decoded once and each chunk is a slice of the source
+        string between token offsets, so overlap tokens are never decoded
+        twice.
+
         Args:
             text: Input text to chunk
             chunk_size: Max tokens per chunk
             overlap: Token overlap between chunks
+            snap: None, "sentence" or "paragraph" to end chunks on a boundary
 
         Returns:
             List of Document objects
         """
-        tokens = self.encoding.encode(text)
-        chunks = []
+        return list(self.iter_chunks([text], chunk_size, overlap, snap=snap))
+
+    def iter_chunks(
+        self,
+        texts: Iterable[str],
+        chunk_size: int = settings.CHUNK_SIZE_TOKENS,
+        overlap: int = settings.CHUNK_OVERLAP_TOKENS,
+        separator: str = "\n\n",
+        snap: Optional[str] = settings.CHUNK_SNAP_TO or None,
+    ) -> Iterator[Document]:
+        """
+        Chunk a sequence of texts (e.g. pages) as a stream.
+
+        Chunks span text boundaries exactly as if the texts were joined with
+        `separator`, and the overlap is carried from one text into the next,
+        but only the current text's tokens plus one chunk are held in memory.
+        Windows that slice to no text are dropped.
+
+        Args:
+            texts: Input texts, consumed lazily
+            chunk_size: Max tokens per chunk
+            overlap: Token overlap between chunks
+            snap: None, "sentence" or "paragraph" to end chunks on a boundary
+
+        Yields:
+            Document objects, in order
+        """
+        _check_snap(snap)
+        # Pending tokens from `start` on, their offsets into buffer_text, and
+        # the text, which keeps a few characters before the pending tokens so
+        # boundary checks see the same context as on the joined text. A
+        # window is only cut once the characters after it are known too.
+        buffer: List[int] = []
+        offsets: List[int] = []
+        buffer_text = ""
         start = 0
 
-        while start < len(tokens):
-            end = start + chunk_size
-            chunk_tokens = tokens[start:end]
-            chunk_text = self.encoding.decode(chunk_tokens)
-            chunks.append(
-                Document(
-                    page_content=chunk_text,
-                    metadata={"token_count": len(chunk_tokens)},
+        # None marks the end of input: the remaining windows can be cut
+        for i, text in enumerate(chain(texts, [None])):
+            if text is not None:
+                tokens = self.encoding.encode(separator + text if i else text)
+                if not tokens:
+                    continue
+                buffer, offsets, buffer_text = self._compact(
+                    buffer, offsets, buffer_text, start
                 )
-            )
+                start = 0
+                piece, piece_offsets = self._offsets(tokens)
+                base = len(buffer_text)
+                buffer.extend(tokens)
+                offsets.extend(base + offset for offset in piece_offsets)
+                buffer_text += piece
 
-            # Move start forward, leaving overlap
-            start = end - overlap if end < len(tokens) else len(tokens)
+            while len(buffer) - start > chunk_size and (
+                text is None
+                or len(buffer_text) - offsets[start + chunk_size] >= BOUNDARY_LOOKAHEAD
+            ):
+                end = self._window_end(
+                    buffer_text, buffer, offsets, start, chunk_size, overlap, snap
+                )
+                chunk = buffer_text[offsets[start] : offsets[end]]
+                if chunk:
+                    yield Document(
+                        page_content=chunk, metadata={"token_count": end - start}
+                    )
+                start = self._next_start(buffer, start, end, overlap)
+
+        chunk = buffer_text[offsets[start] :] if start < len(buffer) else ""
+        if chunk:
+            yield Document(
+                page_content=chunk, metadata={"token_count": len(buffer) - start}
+            )
 
-        return chunks
+    def _compact(
+        self, buffer: List[int], offsets: List[int], buffer_text: str, start: int
+    ) -> Tuple[List[int], List[int], str]:
+        """Drop tokens before `start`, keeping BOUNDARY_LOOKBEHIND characters."""
+        if not buffer:
+            return buffer, offsets, buffer_text
+        drop = max(0, offsets[start] - BOUNDARY_LOOKBEHIND)
+        return (
+            buffer[start:],
+            [offset - drop for offset in offsets[start:]],
+            buffer_text[drop:],
+        )
 
     def extract_questions_and_answers(self, content: dict) -> List[Tuple[str, str]]:
         """
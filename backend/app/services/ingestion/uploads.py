@@ -0,0 +1,80 @@
+"""
+Storage layout and part planning for direct-to-S3 document uploads.
+
+Browsers upload documents straight to S3 with presigned multipart URLs; the
+API only issues the URLs and registers the finished object, so upload
+bandwidth never passes through the API process.
+"""
+
+import math
+import re
+import uuid
+from pathlib import Path
+from typing import Tuple
+from uuid import UUID
+
+from app.core.config import settings
+
+# File types document_parser can ingest
+DOCUMENT_EXTENSIONS = {".pdf", ".doc", ".docx", ".csv", ".xls", ".xlsx"}
+
+# S3 limits: at most 10,000 parts, each at least 5 MB except the last
+MAX_PARTS = 10_000
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def upload_prefix(persona_id: UUID) -> str:
+    """Key prefix under which a persona's uploads are stored."""
+    return f"uploads/{persona_id}/"
+
+
+def new_upload_key(persona_id: UUID, filename: str) -> str:
+    """
+    Build a fresh storage key for an uploaded document.
+
+    Args:
+        persona_id: Persona the document belongs to
+        filename: Client-supplied file name
+
+    Returns:
+        Unique key ending in the sanitized file name (its extension picks the
+        parser)
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    name = Path(filename).name
+    ext = Path(name).suffix.lower()
+    if ext not in DOCUMENT_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {ext or filename}")
+
+    stem = _UNSAFE_CHARS.sub("_", Path(name).stem).strip("._")[:100] or "document"
+    return f"{upload_prefix(persona_id)}{uuid.uuid4()}/{stem}{ext}"
+
+
+def plan_parts(file_size: int) -> Tuple[int, int]:
+    """
+    Choose the multipart part size and count for an upload.
+
+    Args:
+        file_size: Size of the file in bytes
+
+    Returns:
+        (part_size, part_count)
+
+    Raises:
+        ValueError: If the size is not positive or above DOCUMENT_UPLOAD_MAX_MB
+    """
+    if file_size <= 0:
+        raise ValueError("File is empty")
+    if file_size > settings.DOCUMENT_UPLOAD_MAX_MB * 1024 * 1024:
+        raise ValueError(f"File exceeds {settings.DOCUMENT_UPLOAD_MAX_MB} MB")
+
+    part_size = max(
+        settings.DOCUMENT_UPLOAD_PART_MB * 1024 * 1024,
+        MIN_PART_SIZE,
+        math.ceil(file_size / MAX_PARTS),
+    )
+    return part_size, math.ceil(file_size / part_size)
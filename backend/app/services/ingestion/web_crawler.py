@@ -0,0 +1,265 @@
+"""
+Async crawler for url_source modules.
+
+One httpx.AsyncClient (one connection pool) serves the whole crawl, with a
+semaphore bounding concurrent requests per host. Pages fetched before are
+requested conditionally with their stored ETag / Last-Modified, so an
+unchanged page costs a 304 and no parsing. robots.txt is honoured per
+RFC 9309: a missing file (4xx) allows everything, an unreachable one (5xx,
+network error) allows nothing. Links are optionally followed breadth-first
+within the start URL's host, up to a page budget.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from bs4 import BeautifulSoup
+
+from app.core.config import settings
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+@dataclass
+class CrawledPage:
+    """Outcome of fetching one URL."""
+
+    url: str
+    # "fetched", "not_modified", "blocked" (robots.txt) or "error"
+    status: str
+    title: str = ""
+    text: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Resolve against base and drop the fragment; None for non-HTTP URLs."""
+    url = urldefrag(urljoin(base, url) if base else url).url
+    if urlsplit(url).scheme not in ("http", "https"):
+        return None
+    return url
+
+
+def parse_html(html: str, base_url: str) -> tuple[str, str, List[str]]:
+    """
+    Extract title, visible text and outgoing links from an HTML page.
+
+    Text extraction matches langchain's WebBaseLoader (html.parser,
+    get_text()), so chunks stay stable for pages scraped before.
+
+    Returns:
+        (title, text, absolute link URLs)
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text().strip() if soup.title else ""
+
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = normalize_url(anchor["href"], base_url)
+        if link:
+            links.append(link)
+
+    return title, soup.get_text(), links
+
+
+class WebCrawler:
+    """Fetches url_source pages over one pooled HTTP client."""
+
+    def __init__(
+        self,
+        per_host_concurrency: int = settings.WEB_CRAWL_PER_HOST_CONCURRENCY,
+        timeout: float = settings.WEB_CRAWL_TIMEOUT,
+        max_bytes: int = settings.WEB_CRAWL_MAX_BYTES,
+        user_agent: str = settings.WEB_CRAWL_USER_AGENT,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.per_host_concurrency = per_host_concurrency
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        # An injected client (e.g. with a mock transport) is left open
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": user_agent},
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._robots: Dict[str, RobotFileParser] = {}
+        self._robots_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "WebCrawler":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_limits[host]
+
+    async def _robots_for(self, url: str) -> RobotFileParser:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        # One robots.txt request per origin, even for concurrent pages
+        async with self._robots_lock:
+            if origin in self._robots:
+                return self._robots[origin]
+
+            parser = RobotFileParser(f"{origin}/robots.txt")
+            try:
+                async with self._host_limit(url):
+                    response = await self.client.get(parser.url)
+                if response.status_code >= 500:
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            except httpx.HTTPError:
+                parser.disallow_all = True
+
+            self._robots[origin] = parser
+            return parser
+
+    async def fetch(
+        self,
+        url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CrawledPage:
+        """
+        Fetch one page, conditionally if validators are given.
+
+        Args:
+            url: Page URL
+            etag: ETag stored from the previous fetch
+            last_modified: Last-Modified stored from the previous fetch
+
+        Returns:
+            CrawledPage; never raises for HTTP or network errors
+        """
+        robots = await self._robots_for(url)
+        if not robots.can_fetch(self.user_agent, url):
+            return CrawledPage(url=url, status="blocked")
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        try:
+            async with self._host_limit(url):
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304:
+                        return CrawledPage(
+                            url=url,
+                            status="not_modified",
+                            etag=etag,
+                            last_modified=last_modified,
+                        )
+                    response.raise_for_status()
+
+                    content_type = response.headers.get("Content-Type", "")
+                    if not content_type.startswith(HTML_TYPES):
+                        return CrawledPage(
+                            url=url,
+                            status="error",
+                            error=f"Not an HTML page ({content_type})",
+                        )
+
+                    body = bytearray()
+                    async for block in response.aiter_bytes():
+                        body.extend(block)
+                        if len(body) > self.max_bytes:
+                            return CrawledPage(
+                                url=url,
+                                status="error",
+                                error=f"Page exceeds {self.max_bytes} bytes",
+                            )
+                    html = bytes(body).decode(response.encoding or "utf-8", "replace")
+                    final_url = str(response.url)
+                    new_etag = response.headers.get("ETag")
+                    new_last_modified = response.headers.get("Last-Modified")
+        except httpx.HTTPError as e:
+            return CrawledPage(url=url, status="error", error=str(e))
+
+        title, text, links = parse_html(html, final_url)
+        return CrawledPage(
+            url=url,
+            status="fetched",
+            title=title,
+            text=text,
+            etag=new_etag,
+            last_modified=new_last_modified,
+            links=links,
+        )
+
+    async def crawl(
+        self,
+        start_url: str,
+        max_pages: int = 1,
+        follow_links: bool = False,
+        previous: Optional[Dict[str, dict]] = None,
+    ) -> List[CrawledPage]:
+        """
+        Crawl breadth-first from start_url, a level at a time.
+
+        Args:
+            start_url: First page
+            max_pages: Most pages to fetch (robots-blocked ones included)
+            follow_links: Follow links to pages on the start URL's host
+            previous: url -> {"etag", "last_modified", "links"} from the last
+                crawl; unchanged pages keep their stored links
+
+        Returns:
+            Pages in crawl order
+        """
+        previous = previous or {}
+        start = normalize_url(start_url)
+        if start is None:
+            raise ValueError(f"Not an HTTP(S) URL: {start_url}")
+        host = urlsplit(start).netloc
+
+        seen: Set[str] = {start}
+        frontier = [start]
+        pages: List[CrawledPage] = []
+
+        while frontier and len(pages) < max_pages:
+            level = frontier[: max_pages - len(pages)]
+            results = await asyncio.gather(
+                *(
+                    self.fetch(
+                        url,
+                        previous.get(url, {}).get("etag"),
+                        previous.get(url, {}).get("last_modified"),
+                    )
+                    for url in level
+                )
+            )
+            for page in results:
+                if page.status == "not_modified":
+                    page.links = previous[page.url].get("links", [])
+            pages.extend(results)
+            if not follow_links:
+                break
+
+            frontier = []
+            for page in results:
+                for link in page.links:
+                    if link not in seen and urlsplit(link).netloc == host:
+                        seen.add(link)
+                        frontier.append(link)
+
+        return pages
@@ -1,21 +1,127 @@
-from langchain_community.document_loaders import WebBaseLoader
+import asyncio
+import hashlib
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
 from langchain_core.documents import Document
-from typing import List
 
+from app.core.config import settings
+from app.services.ingestion.web_crawler import WebCrawler
+
+
+# Joins the page texts stored in a url_source module's "scraped_content"
+PAGE_SEPARATOR = "\n\n"
+
+
+def _page_entry(page: dict, text: str) -> dict:
+    """
+    What a url_source module stores about a page in "scraped_pages".
+
+    Only what conditional requests and link following need, plus the text's
+    hash (to detect changes) and length (to slice it out of
+    "scraped_content", where each page's text is stored once).
+    """
+    return {
+        "url": page["url"],
+        "title": page.get("title", ""),
+        "etag": page.get("etag"),
+        "last_modified": page.get("last_modified"),
+        "links": page.get("links", []),
+        "hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "length": len(text),
+    }
+
+
+def _stored_texts(content: dict) -> Dict[str, str]:
+    """Page texts of the last crawl by URL, sliced out of "scraped_content"."""
+    scraped = content.get("scraped_content", "")
+    texts = {}
+    offset = 0
+    for page in content.get("scraped_pages", []):
+        if "text" in page:
+            # Stored before page texts moved to scraped_content
+            texts[page["url"]] = page["text"]
+            continue
+        texts[page["url"]] = scraped[offset : offset + page["length"]]
+        offset += page["length"] + len(PAGE_SEPARATOR)
+    return texts
 
-def load_web_content(url: str) -> List[Document]:
+
+def scrape_url_source(content: dict) -> Tuple[dict, bool]:
     """
-    Load and parse web content from a URL.
+    Crawl a url_source module's site, reusing what is unchanged.
+
+    Pages stored by the last crawl are requested conditionally and kept as
+    they are when the server answers 304, or when they fail transiently.
+    Module content keys read: "url", optional "follow_links" (bool) and
+    "max_pages" (capped at WEB_CRAWL_MAX_PAGES).
 
     Args:
-        url: The URL to load content from
+        content: Module content
 
     Returns:
-        List of Document objects
+        (new content with "scraped_pages" (per-page validators),
+        "scraped_content" (the page texts) and "last_scraped", whether any
+        page text changed)
+
+    Raises:
+        Exception: If no page could be fetched or kept
     """
-    loader = WebBaseLoader(
-        web_paths=(url,),
-    )
-    docs = loader.load()
+    url = content.get("url")
+    follow_links = bool(content.get("follow_links", False))
+    max_pages = settings.WEB_CRAWL_MAX_PAGES if follow_links else 1
+    max_pages = min(int(content.get("max_pages") or max_pages), max_pages)
+
+    stored = {page["url"]: page for page in content.get("scraped_pages", [])}
+    stored_texts = _stored_texts(content)
+
+    async def crawl():
+        async with WebCrawler() as crawler:
+            return await crawler.crawl(
+                url, max_pages=max_pages, follow_links=follow_links, previous=stored
+            )
+
+    pages = []
+    texts = []
+    for page in asyncio.run(crawl()):
+        if page.status == "fetched":
+            pages.append(_page_entry(asdict(page), page.text))
+            texts.append(page.text)
+        elif page.url in stored and page.status in ("not_modified", "error"):
+            text = stored_texts[page.url]
+            pages.append(_page_entry(stored[page.url], text))
+            texts.append(text)
+        elif page.status != "not_modified":
+            print(f"Skipping {page.url}: {page.error or page.status}")
+
+    if not pages:
+        raise Exception(f"Could not fetch {url}")
+
+    changed = [(page["url"], page["hash"]) for page in pages] != [
+        (page["url"], page.get("hash")) for page in stored.values()
+    ]
+    new_content = {
+        **content,
+        "scraped_pages": pages,
+        "scraped_content": PAGE_SEPARATOR.join(texts),
+        "last_scraped": str(datetime.now()),
+    }
+    return new_content, changed
+
+
+def url_source_documents(content: dict) -> List[Document]:
+    """Documents for a scraped url_source module, one per page."""
+    pages = content.get("scraped_pages")
+    if pages is None:
+        # Scraped before per-page storage
+        return [Document(page_content=content.get("scraped_content", ""))]
 
-    return docs
+    texts = _stored_texts(content)
+    return [
+        Document(
+            page_content=texts[page["url"]],
+            metadata={"source": page["url"], "title": page["title"]},
+        )
+        for page in pages
+    ]
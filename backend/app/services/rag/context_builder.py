@@ -4,8 +4,7 @@ from typing import List, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.persona import Persona
-from app.memory.vectorstore import _vector_store
-from app.crud.crud_knowledge import knowledge_module_crud
+from app.services.rag.vector_search import vector_search_service
 
 
 class ContextBuilder:
@@ -34,14 +33,9 @@ class ContextBuilder:
             Dict with 'system_prompt', 'context', 'sources'
         """
 
-        modules = await knowledge_module_crud.get_by_persona(
-            db=db, persona_id=persona.id
-        )
-        module_ids = [module.id for module in modules]
-        # 1. Search for relevant chunks
-
-        relevant_chunks = await _vector_store.asimilarity_search(
-            query=query, k=5, filter={"module_id": {"$in": module_ids}}
+        # 1. Search for relevant chunks (query embedding is batched off-loop)
+        relevant_chunks = await vector_search_service.search_similar_chunks(
+            db=db, persona_id=persona.id, query_text=query, top_k=5
         )
 
         # 2. Build system prompt
@@ -5,47 +5,157 @@ from uuid import UUID
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.embeddings.tools import embedding_tools
+from app.core.config import settings
+from app.services.embeddings.tools import get_embedding_tools
+
+# pgvector rejects hnsw.ef_search values outside this range
+HNSW_EF_SEARCH_MIN = 1
+HNSW_EF_SEARCH_MAX = 1000
+
+# Phase one of the two-phase search; also used by scripts/explain_vector_search.py
+CANDIDATE_SQL = text(
+    """
+    SELECT
+        kc.id,
+        kc.module_id,
+        kc.chunk_text,
+        kc.chunk_index,
+        kc.token_count,
+        kc.chunk_metadata,
+        km.module_type,
+        km.title,
+        km.priority,
+        kc.embedding <=> :query_embedding as distance
+    FROM knowledge_chunks kc
+    JOIN knowledge_modules km ON kc.module_id = km.id
+    WHERE km.persona_id = :persona_id
+        AND km.is_active = true
+        AND kc.embedding IS NOT NULL
+    ORDER BY kc.embedding <=> :query_embedding
+    LIMIT :candidate_k
+"""
+)
 
 
 class VectorSearchService:
     """Service for vector similarity search."""
 
-    async def search_similar_chunks(
+    async def _set_ef_search(self, db: AsyncSession, ef_search: int | None) -> None:
+        """
+        Scope the HNSW candidate list size to the current transaction.
+
+        Larger values trade latency for recall; chat traffic keeps the default
+        while owner tooling can ask for more.
+        """
+        if ef_search is None:
+            ef_search = settings.VECTOR_SEARCH_EF_SEARCH
+        ef_search = max(HNSW_EF_SEARCH_MIN, min(int(ef_search), HNSW_EF_SEARCH_MAX))
+
+        # SET does not accept bind parameters; the value is a clamped int
+        await db.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+
+    async def _set_iterative_scan(self, db: AsyncSession) -> None:
+        """
+        Let the HNSW scan continue past ef_search until enough rows pass the
+        persona/is_active filter (pgvector >= 0.8).
+
+        The filter is applied after the index scan, so without this a scan
+        returns at most ef_search rows across all personas and small personas
+        lose recall. max_scan_tuples bounds the extra work.
+        """
+        mode = settings.VECTOR_SEARCH_ITERATIVE_SCAN
+        if mode == "off":
+            return
+        if mode not in ("relaxed_order", "strict_order"):
+            raise ValueError(f"Invalid VECTOR_SEARCH_ITERATIVE_SCAN: {mode}")
+
+        max_scan_tuples = max(1, int(settings.VECTOR_SEARCH_MAX_SCAN_TUPLES))
+        await db.execute(text(f"SET LOCAL hnsw.iterative_scan = {mode}"))
+        await db.execute(text(f"SET LOCAL hnsw.max_scan_tuples = {max_scan_tuples}"))
+
+    async def _fetch_candidates(
         self,
         db: AsyncSession,
         persona_id: UUID,
-        query_text: str,
-        top_k: int = 5,
-        similarity_threshold: float = 0.7,
+        query_embedding: List[float],
+        candidate_k: int,
+        ef_search: int | None = None,
     ) -> List[Dict]:
         """
-        Search for similar knowledge chunks using vector similarity.
+        Phase one: nearest neighbours ordered purely by distance.
 
-        Args:
-            db: Database session
-            persona_id: Persona ID to search within
-            query_text: Query text to search for
-            top_k: Number of top results to return
-            similarity_threshold: Minimum similarity score (0-1)
+        Ordering by the distance expression alone (no priority, no threshold in
+        WHERE) is what lets Postgres walk the HNSW index instead of scanning
+        every chunk of the persona. relaxed_order may return rows slightly out
+        of distance order; _rerank sorts them again.
+        """
+        # ef_search bounds how many rows each index scan pass returns
+        await self._set_ef_search(
+            db, max(ef_search or settings.VECTOR_SEARCH_EF_SEARCH, candidate_k)
+        )
+        await self._set_iterative_scan(db)
+        result = await db.execute(
+            CANDIDATE_SQL,
+            {
+                "query_embedding": str(query_embedding),
+                "persona_id": str(persona_id),
+                "candidate_k": candidate_k,
+            },
+        )
 
-        Returns:
-            List of dicts with chunk info and similarity score
+        return [
+            {
+                "chunk_id": row[0],
+                "module_id": row[1],
+                "chunk_text": row[2],
+                "chunk_index": row[3],
+                "token_count": row[4],
+                "metadata": row[5],
+                "module_type": row[6],
+                "module_title": row[7],
+                "module_priority": row[8],
+                "similarity_score": 1 - float(row[9]),
+            }
+            for row in result.fetchall()
+        ]
+
+    async def _exact_search(
+        self,
+        db: AsyncSession,
+        persona_id: UUID,
+        query_embedding: List[float],
+        top_k: int,
+        similarity_threshold: float | None = None,
+        module_types: List[str] | None = None,
+    ) -> List[Dict]:
         """
-        # Generate query embedding
-        query_embedding = embedding_tools.embed_query(query_text)
+        Exact scan in strict priority order, then similarity.
+
+        Priority ordering and the threshold predicate mean the vector index
+        cannot be used, so every matching persona chunk is scored.
+        """
+        filters = ""
+        params = {
+            "query_embedding": str(query_embedding),
+            "persona_id": str(persona_id),
+            "top_k": top_k,
+        }
+        if similarity_threshold is not None:
+            filters += "AND 1 - (kc.embedding <=> :query_embedding) >= :threshold\n"
+            params["threshold"] = similarity_threshold
+        if module_types:
+            filters += "AND km.module_type = ANY(:module_types)\n"
+            params["module_types"] = module_types
 
-        # Build SQL query with vector similarity
-        # Using cosine distance (1 - cosine similarity)
         query_sql = text(
-            """
-            SELECT 
+            f"""
+            SELECT
                 kc.id,
                 kc.module_id,
                 kc.chunk_text,
                 kc.chunk_index,
                 kc.token_count,
-                kc.metadata,
+                kc.chunk_metadata,
                 km.module_type,
                 km.title,
                 km.priority,
@@ -55,25 +165,15 @@ class VectorSearchService:
             WHERE km.persona_id = :persona_id
                 AND km.is_active = true
                 AND kc.embedding IS NOT NULL
-                AND 1 - (kc.embedding <=> :query_embedding) >= :threshold
-            ORDER BY 
+                {filters}
+            ORDER BY
                 km.priority DESC,
                 similarity_score DESC
             LIMIT :top_k
         """
         )
 
-        result = await db.execute(
-            query_sql,
-            {
-                "query_embedding": str(query_embedding),
-                "persona_id": str(persona_id),
-                "threshold": similarity_threshold,
-                "top_k": top_k,
-            },
-        )
-
-        rows = result.fetchall()
+        result = await db.execute(query_sql, params)
 
         return [
             {
@@ -88,9 +188,91 @@ class VectorSearchService:
                 "module_priority": row[8],
                 "similarity_score": float(row[9]),
             }
-            for row in rows
+            for row in result.fetchall()
         ]
 
+    def _rerank(
+        self,
+        candidates: List[Dict],
+        top_k: int,
+        similarity_threshold: float | None = None,
+    ) -> List[Dict]:
+        """
+        Phase two: threshold and priority-weighted re-score in Python.
+
+        Each priority step above 1 adds VECTOR_SEARCH_PRIORITY_WEIGHT to the
+        cosine similarity, so priority nudges the ranking without letting a
+        weak match from a high-priority module beat a strong one.
+        """
+        weight = settings.VECTOR_SEARCH_PRIORITY_WEIGHT
+        ranked = []
+        for chunk in candidates:
+            if (
+                similarity_threshold is not None
+                and chunk["similarity_score"] < similarity_threshold
+            ):
+                continue
+            priority = chunk.get("module_priority") or 1
+            chunk["rank_score"] = chunk["similarity_score"] + weight * (priority - 1)
+            ranked.append(chunk)
+
+        ranked.sort(key=lambda c: c["rank_score"], reverse=True)
+        return ranked[:top_k]
+
+    def _candidate_k(self, top_k: int) -> int:
+        """Size of the ANN candidate set fetched for a top_k request."""
+        candidate_k = top_k * settings.VECTOR_SEARCH_CANDIDATE_MULTIPLIER
+        return max(top_k, min(candidate_k, HNSW_EF_SEARCH_MAX))
+
+    async def search_similar_chunks(
+        self,
+        db: AsyncSession,
+        persona_id: UUID,
+        query_text: str,
+        top_k: int = 5,
+        similarity_threshold: float = 0.7,
+        ef_search: int | None = None,
+        two_phase: bool = True,
+    ) -> List[Dict]:
+        """
+        Search for similar knowledge chunks using vector similarity.
+
+        Args:
+            db: Database session
+            persona_id: Persona ID to search within
+            query_text: Query text to search for
+            top_k: Number of top results to return
+            similarity_threshold: Minimum similarity score (0-1)
+            ef_search: HNSW search breadth for this query
+                (defaults to settings.VECTOR_SEARCH_EF_SEARCH)
+            two_phase: Fetch ANN candidates by distance and re-rank with a
+                priority-weighted score in Python. False runs the exact scan
+                in strict priority order.
+
+        Returns:
+            List of dicts with chunk info and similarity score
+        """
+        # Generate query embedding
+        query_embedding = await get_embedding_tools().aembed_query(query_text)
+
+        if two_phase:
+            candidates = await self._fetch_candidates(
+                db,
+                persona_id=persona_id,
+                query_embedding=query_embedding,
+                candidate_k=self._candidate_k(top_k),
+                ef_search=ef_search,
+            )
+            return self._rerank(candidates, top_k, similarity_threshold)
+
+        return await self._exact_search(
+            db,
+            persona_id=persona_id,
+            query_embedding=query_embedding,
+            top_k=top_k,
+            similarity_threshold=similarity_threshold,
+        )
+
     async def search_by_module_type(
         self,
         db: AsyncSession,
@@ -103,50 +285,26 @@ class VectorSearchService:
         Search within specific module types.
 
         Useful for targeted retrieval (e.g., only from 'qna' modules).
+        Results are in strict priority order, then similarity.
         """
-        query_embedding = embedding_tools.embed_query(query_text)
-
-        query_sql = text(
-            """
-            SELECT 
-                kc.id,
-                kc.module_id,
-                kc.chunk_text,
-                km.module_type,
-                1 - (kc.embedding <=> :query_embedding) as similarity_score
-            FROM knowledge_chunks kc
-            JOIN knowledge_modules km ON kc.module_id = km.id
-            WHERE km.persona_id = :persona_id
-                AND km.module_type = ANY(:module_types)
-                AND km.is_active = true
-                AND kc.embedding IS NOT NULL
-            ORDER BY 
-                km.priority DESC,
-                similarity_score DESC
-            LIMIT :top_k
-        """
-        )
+        query_embedding = await get_embedding_tools().aembed_query(query_text)
 
-        result = await db.execute(
-            query_sql,
-            {
-                "query_embedding": str(query_embedding),
-                "persona_id": str(persona_id),
-                "module_types": module_types,
-                "top_k": top_k,
-            },
+        chunks = await self._exact_search(
+            db,
+            persona_id=persona_id,
+            query_embedding=query_embedding,
+            top_k=top_k,
+            module_types=module_types,
         )
-
-        rows = result.fetchall()
         return [
             {
-                "chunk_id": row[0],
-                "module_id": row[1],
-                "chunk_text": row[2],
-                "module_type": row[3],
-                "similarity_score": float(row[4]),
+                "chunk_id": chunk["chunk_id"],
+                "module_id": chunk["module_id"],
+                "chunk_text": chunk["chunk_text"],
+                "module_type": chunk["module_type"],
+                "similarity_score": chunk["similarity_score"],
             }
-            for row in rows
+            for chunk in chunks
         ]
 
 
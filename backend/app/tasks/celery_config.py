@@ -1,7 +1,18 @@
+from typing import Any, Dict, Optional
+
 from celery import Celery
+from kombu import Queue
 
 from app.core.config import settings
 
+# Small text modules owners expect to see processed right away
+FAST_QUEUE = "fast"
+# Documents, scraping and fan-out subtasks that can take minutes
+BULK_QUEUE = "bulk"
+
+# Module types whose processing time depends on an external file or site
+BULK_MODULE_TYPES = {"document", "url_source"}
+
 
 celery_app = Celery(
     "anonchat_tasks",
@@ -20,6 +31,107 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=600,  # 10 minutes
     task_soft_time_limit=540,  # 9 minutes
-    worker_prefetch_multiplier=4,
+    # Per-queue prefetch/concurrency are set on each worker's command line
+    # (make worker-fast / make worker-bulk); this is the conservative default
+    worker_prefetch_multiplier=1,
+    # Recycled children are re-forked from the parent, which already holds
+    # the embedding model (see app/tasks/worker_bootstrap.py)
     worker_max_tasks_per_child=100,
+    task_queues=(Queue(FAST_QUEUE), Queue(BULK_QUEUE)),
+    task_default_queue=FAST_QUEUE,
+    task_routes={
+        "tasks.embed_document_pages": {"queue": BULK_QUEUE},
+        "tasks.finalize_knowledge_module": {"queue": BULK_QUEUE},
+    },
+    # Run with `make beat`
+    beat_schedule={
+        "refresh-url-sources": {
+            "task": "tasks.refresh_url_sources",
+            "schedule": settings.WEB_REFRESH_CHECK_MINUTES * 60,
+        },
+        "reconcile-document-blobs": {
+            "task": "tasks.reconcile_document_blobs",
+            "schedule": settings.DOCUMENT_BLOB_RECONCILE_MINUTES * 60,
+        },
+    },
 )
+
+# Connects the worker boot signal handlers
+from app.tasks import worker_bootstrap  # noqa: E402, F401
+
+
+def estimate_module_size(module_type: str, content: Optional[Dict[str, Any]]) -> int:
+    """
+    Rough size of a text module's content in characters.
+
+    Args:
+        module_type: Knowledge module type
+        content: Module content JSON
+
+    Returns:
+        Character count of the text that will be chunked (0 if unknown)
+    """
+    content = content or {}
+    if module_type in ("bio", "text_block"):
+        return len(content.get("text", ""))
+    if module_type == "qna":
+        return sum(
+            len(pair.get("q", "")) + len(pair.get("a", ""))
+            for pair in content.get("pairs", [])
+        )
+    return 0
+
+
+def select_queue(module_type: str, size_hint: Optional[int] = None) -> str:
+    """
+    Pick the queue for a knowledge module processing job.
+
+    Args:
+        module_type: Knowledge module type
+        size_hint: Characters of text for text modules, bytes for uploaded
+            files; None when unknown
+
+    Returns:
+        FAST_QUEUE or BULK_QUEUE
+    """
+    if module_type == "document":
+        # Uploaded files go to bulk unless known to be small
+        if size_hint is not None and size_hint <= settings.INGESTION_FAST_MAX_BYTES:
+            return FAST_QUEUE
+        return BULK_QUEUE
+    if module_type in BULK_MODULE_TYPES:
+        return BULK_QUEUE
+    if size_hint is not None and size_hint > settings.INGESTION_FAST_MAX_CHARS:
+        return BULK_QUEUE
+    return FAST_QUEUE
+
+
+def enqueue_knowledge_module(
+    module_id: str,
+    module_type: str,
+    content: Optional[Dict[str, Any]] = None,
+    size_hint: Optional[int] = None,
+    countdown: Optional[float] = None,
+):
+    """
+    Queue tasks.process_knowledge_module on the queue its size calls for.
+
+    Args:
+        module_id: Module to process
+        module_type: Knowledge module type
+        content: Module content, used to estimate size for text modules
+        size_hint: Known size (e.g. upload bytes); overrides the estimate
+        countdown: Seconds to wait before the job may start
+
+    Returns:
+        AsyncResult of the queued task
+    """
+    if size_hint is None and module_type not in BULK_MODULE_TYPES:
+        size_hint = estimate_module_size(module_type, content)
+
+    return celery_app.send_task(
+        "tasks.process_knowledge_module",
+        args=[str(module_id)],
+        queue=select_queue(module_type, size_hint),
+        countdown=countdown,
+    )
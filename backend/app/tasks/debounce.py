@@ -0,0 +1,110 @@
+"""
+Debounced, coalesced re-processing of knowledge modules.
+
+Every edit bumps a per-module version counter in Redis. Only the first edit
+of a burst schedules a job (with a countdown); later edits just bump the
+version and find the job already pending. When the job starts it clears the
+pending flag and records the version it is processing, so an edit made while
+it runs schedules a fresh job and makes the running one stale; the running
+job checks for that between steps and gives up early.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import redis as sync_redis
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import async_redis_pool, sync_redis_pool
+
+from .celery_config import enqueue_knowledge_module
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ingest"
+
+
+def version_key(module_id: str) -> str:
+    return f"{KEY_PREFIX}:version:{module_id}"
+
+
+def pending_key(module_id: str) -> str:
+    return f"{KEY_PREFIX}:pending:{module_id}"
+
+
+async def schedule_knowledge_module(
+    module_id: Any,
+    module_type: str,
+    content: Optional[Dict[str, Any]] = None,
+    delay_seconds: float = settings.INGESTION_DEBOUNCE_SECONDS,
+) -> bool:
+    """
+    Request re-processing of a module, coalescing bursts of edits.
+
+    Args:
+        module_id: Module that changed
+        module_type: Knowledge module type (for queue selection)
+        content: Module content (for queue selection)
+        delay_seconds: How long to wait for further edits before processing
+
+    Returns:
+        True if a job was queued, False if one was already pending
+    """
+    module_id = str(module_id)
+    try:
+        client = redis.Redis(connection_pool=async_redis_pool)
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.incr(version_key(module_id))
+            # Bounded so a lost job cannot block re-processing forever
+            pipe.set(
+                pending_key(module_id),
+                "1",
+                nx=True,
+                ex=int(delay_seconds) + settings.INGESTION_DEBOUNCE_PENDING_TTL,
+            )
+            _, claimed = await pipe.execute()
+    except RedisError as e:
+        # Without Redis, fall back to processing every edit
+        logger.warning(f"Ingestion debounce unavailable, queuing directly: {e}")
+        enqueue_knowledge_module(module_id, module_type, content)
+        return True
+
+    if not claimed:
+        return False
+
+    enqueue_knowledge_module(module_id, module_type, content, countdown=delay_seconds)
+    return True
+
+
+def claim_version(module_id: str) -> Optional[int]:
+    """
+    Called when a processing job starts: clear the pending flag and return
+    the version being processed (0 if the module was never edited).
+
+    Returns None when Redis is unavailable, which disables stale checks.
+    """
+    try:
+        client = sync_redis.Redis(connection_pool=sync_redis_pool)
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(pending_key(module_id))
+        pipe.get(version_key(module_id))
+        _, version = pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Ingestion debounce unavailable: {e}")
+        return None
+    return int(version or 0)
+
+
+def is_stale(module_id: str, version: Optional[int]) -> bool:
+    """True if the module was edited after the job claimed `version`."""
+    if version is None:
+        return False
+    try:
+        client = sync_redis.Redis(connection_pool=sync_redis_pool)
+        current = client.get(version_key(module_id))
+    except RedisError as e:
+        logger.warning(f"Ingestion debounce unavailable: {e}")
+        return False
+    return int(current or 0) > version
@@ -1,19 +1,49 @@
+import time
+from pathlib import Path
 from uuid import UUID
-from typing import List
-from celery import Task
+from typing import Iterable, List, Optional
+from celery import Task, chord
 
-from app.tasks.celery_config import celery_app
+from app.tasks.celery_config import celery_app, enqueue_knowledge_module
+from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.knowledge import KnowledgeModule
+from app.models.knowledge import KnowledgeModule, ProcessingStatus
 from app.services.ingestion.text_processor import text_processor
-from app.services.ingestion.document_parser import load_document
-from app.services.ingestion.web_parser import load_web_content
-from app.memory.vectorstore import get_vector_store
+from app.services.ingestion.document_parser import (
+    count_pdf_pages,
+    has_extracted_text,
+    iter_document,
+    iter_pdf_pages,
+)
+from app.services.ingestion.document_store import (
+    claim_document_blob,
+    copy_twin_chunks,
+    reconcile_document_blobs,
+)
+from app.services.ingestion.fanout_staging import (
+    delete_staging,
+    new_staging_prefix,
+    read_staged_chunks,
+    staged_chunks_key,
+    staged_pages_key,
+    write_staged_chunks,
+    write_staged_pages,
+)
+from app.services.ingestion.text_artifact import store_text_artifact
+from app.services.ingestion.web_parser import (
+    scrape_url_source,
+    url_source_documents,
+)
+from app.core.storage import get_s3_client
+from app.services.ingestion.chunk_sync import (
+    EmbedFn,
+    IngestionAborted,
+    sync_module_chunks,
+)
+from app.tasks.debounce import claim_version, is_stale
+from app.services.embeddings.tools import EmbeddingError, get_embedding_tools
 from langchain_core.documents import Document
-from datetime import datetime
-
-
-vector_store = get_vector_store()
+from datetime import datetime, timedelta
 
 
 class DatabaseTask(Task):
@@ -33,7 +63,16 @@ class DatabaseTask(Task):
             self._session = None
 
 
-@celery_app.task(name="tasks.process_knowledge_module", base=DatabaseTask, bind=True)
+@celery_app.task(
+    name="tasks.process_knowledge_module",
+    base=DatabaseTask,
+    bind=True,
+    # Finished embedding batches are checkpointed in the document embedding
+    # cache, so a retry only embeds what the failed attempt had not reached
+    autoretry_for=(EmbeddingError,),
+    retry_backoff=True,
+    max_retries=3,
+)
 def process_knowledge_module(self, module_id: str):
     """
     Process knowledge module: chunk text and generate embeddings.
@@ -41,11 +80,20 @@ def process_knowledge_module(self, module_id: str):
     This task:
     1. Retrieves module from database
     2. Extracts/chunks text based on module type
-    3. Generates embeddings for each chunk
-    4. Stores chunks with embeddings
+    3. Diffs the chunks against the stored ones by content hash
+    4. Embeds and stores only new chunks, deletes vanished ones (all of
+       them if the content was cleared)
+
+    Re-ingesting an edited module therefore only pays for the chunks that
+    actually changed, and the swap happens in one transaction. Large PDFs
+    are instead fanned out to page-range subtasks (see _fan_out_pdf).
     """
     db = self.session
 
+    # Clears the debounce flag: edits from now on schedule a new job and
+    # make this one stale
+    version = claim_version(module_id)
+
     # Get module
     module = (
         db.query(KnowledgeModule).filter(KnowledgeModule.id == UUID(module_id)).first()
@@ -54,69 +102,437 @@ def process_knowledge_module(self, module_id: str):
     if not module:
         return {"error": "Module not found"}
 
+    # From here on a failure leaves the module FAILED, never PENDING
+    was_completed = module.processing_status == ProcessingStatus.COMPLETED
+    module.processing_status = ProcessingStatus.PROCESSING
+    db.commit()
+    final_attempt = self.request.retries >= self.max_retries
+
     # Extract text based on module type
-    docs = []
-    if module.module_type == "bio":
-        docs.append(Document(page_content=module.content.get("text", "")))
+    try:
+        docs = _extract_docs(db, module, version, was_completed)
+    except Exception as e:
+        _record_failure(db, module, e, final_attempt)
+        raise
+    if isinstance(docs, dict):
+        if "error" in docs:
+            module.processing_status = ProcessingStatus.FAILED
+            db.commit()
+        return docs
+
+    if is_stale(module_id, version):
+        return {"module_id": module_id, "stale": True}
+
+    # Chunk lazily; overlap carries across page boundaries, and chunks are
+    # embedded and written in bounded batches as they are produced. Cleared
+    # content yields no chunks, so the sync deletes every stored one.
+    chunks = text_processor.iter_chunks(doc.page_content for doc in docs)
+
+    return _sync_chunks(db, module, chunks, version, final_attempt=final_attempt)
+
+
+def _extract_docs(
+    db, module: KnowledgeModule, version: Optional[int], was_completed: bool
+) -> Iterable[Document] | dict:
+    """
+    Documents to chunk for a module, by module type.
+
+    Args:
+        db: Sync database session
+        module: Module being ingested, already marked PROCESSING
+        version: Debounce version this job is processing
+        was_completed: Whether the module was COMPLETED before this job
 
-    elif module.module_type == "qna":
+    Returns:
+        The documents, or a task result dict if processing ends early
+    """
+    if module.module_type in ("bio", "text_block"):
+        return [Document(page_content=module.content.get("text", ""))]
+
+    if module.module_type == "qna":
         # Extract Q&A pairs as text
-        pairs = module.content.get("pairs", [])
+        return [
+            Document(page_content=f"Q: {pair.get('q', '')}\nA: {pair.get('a', '')}")
+            for pair in module.content.get("pairs", [])
+        ]
 
-        for pair in pairs:
-            q = pair.get("q", "")
-            a = pair.get("a", "")
-            docs.append(Document(page_content=f"Q: {q}\nA: {a}"))
+    if module.module_type == "url_source":
+        return _extract_url_source(db, module, version, was_completed)
 
-    elif module.module_type == "text_block":
-        docs.append(Document(page_content=module.content.get("text", "")))
+    if module.module_type == "document":
+        return _extract_document(db, module, version)
 
-    elif module.module_type == "url_source":
-        if "scraped_content" not in module.content:
-            url = module.content.get("url")
-            try:
+    return {"error": f"Unknown module type: {module.module_type}"}
 
-                scraped: List[Document] = load_web_content(url)
-                module.content["scraped_content"] = "\n\n".join(
-                    [doc.page_content for doc in scraped]
-                )
-                module.content["last_scraped"] = str(datetime.now())
-                db.commit()
-            except Exception as e:
-                return {"error": f"Failed to scrape URL: {str(e)}"}
 
-            docs.extend(scraped)
+def _extract_url_source(
+    db, module: KnowledgeModule, version: Optional[int], was_completed: bool
+) -> Iterable[Document] | dict:
+    """Re-crawl a url_source module and store what was scraped."""
+    module_id = str(module.id)
 
-    elif module.module_type == "document":
-        docs.extend(load_document(module.file_storage_key))
+    # Conditional re-crawl: unchanged pages cost a 304 and keep their text
+    try:
+        content, changed = scrape_url_source(module.content)
+    except Exception as e:
+        return {"error": f"Failed to scrape URL: {str(e)}"}
 
-    else:
-        return {"error": f"Unknown module type: {module.module_type}"}
+    # Don't write scraped content over a newer edit of the module
+    if is_stale(module_id, version):
+        return {"module_id": module_id, "stale": True}
 
-    if not docs:
-        return {"error": "No content to process"}
+    # A new dict, since in-place JSONB changes are not tracked
+    module.content = content
+    if not changed and was_completed:
+        module.processing_status = ProcessingStatus.COMPLETED
+    db.commit()
 
-    # Chunk text
-    chunks: List[Document] = text_processor.chunk_text(
-        text="\n\n".join([doc.page_content for doc in docs])
-    )
+    if not changed and was_completed:
+        return {"module_id": module_id, "unchanged": True}
+
+    return url_source_documents(content)
+
+
+def _extract_document(
+    db, module: KnowledgeModule, version: Optional[int]
+) -> Iterable[Document] | dict:
+    """Stream an uploaded document's pages, or finish it without parsing."""
+    module_id = str(module.id)
+
+    # Moves a fresh upload to storage shared by every module with the same
+    # file; if one of them is already processed, reuse its chunks
+    claim_document_blob(db, module, get_s3_client())
+    twin_id = copy_twin_chunks(db, module)
+    if twin_id is not None:
+        module.processing_status = ProcessingStatus.COMPLETED
+        db.commit()
+        print(f"Module {module_id}: copied chunks from module {twin_id}")
+        return {"module_id": module_id, "copied_from": str(twin_id)}
+
+    # Cached extracted text makes the serial path cheap; only parse-heavy
+    # PDFs are worth fanning out
+    is_pdf = Path(module.file_storage_key).suffix.lower() == ".pdf"
+    if is_pdf and not has_extracted_text(module.file_storage_key):
+        page_count = count_pdf_pages(module.file_storage_key)
+        if page_count >= settings.INGESTION_FANOUT_MIN_PAGES:
+            return _fan_out_pdf(module, page_count, version)
+
+    # Streamed page by page: nothing below holds the whole document
+    return iter_document(module.file_storage_key)
+
+
+def _module_embed_fn(skipped: int = 0) -> EmbedFn:
+    """
+    embed_documents_cached with EMBEDDING_MAX_SKIPPED counted across every
+    batch of one module, not per batch.
 
-    chunk_records: List[Document] = []
-    for idx, chunk_document in enumerate(chunks):
-        chunk_document.metadata.update(
-            {
-                "source_type": module.module_type,
-                "module_id": module.id,
-                "chunk_index": idx,
-                "created_at": datetime.now(),
-            }
+    New chunks go through the content-addressed cache, so text shared with
+    other modules is not run through the model again either.
+
+    Args:
+        skipped: Chunks already dropped upstream (fan-out subtasks)
+    """
+    total_skipped = skipped
+
+    def embed(texts: List[str]) -> List[Optional[List[float]]]:
+        nonlocal total_skipped
+        budget = max(0, settings.EMBEDDING_MAX_SKIPPED - total_skipped)
+        embeddings = get_embedding_tools().embed_documents_cached(
+            texts, max_skipped=budget
         )
-        chunk_records.append(chunk_document)
+        total_skipped += sum(1 for embedding in embeddings if embedding is None)
+        if total_skipped > settings.EMBEDDING_MAX_SKIPPED:
+            raise EmbeddingError(f"{total_skipped} chunks failed to embed, giving up")
+        return embeddings
+
+    return embed
+
+
+def _sync_chunks(
+    db,
+    module: KnowledgeModule,
+    chunks: Iterable[Document],
+    version: Optional[int],
+    skipped: int = 0,
+    final_attempt: bool = True,
+) -> dict:
+    """
+    Sync the module's stored chunks to `chunks` and record the outcome.
+
+    Marks the module COMPLETED, or rolls back and marks it FAILED (re-raising)
+    if anything goes wrong. An EmbeddingError that the task will retry leaves
+    it PROCESSING instead. If the module is edited again meanwhile, the work
+    is rolled back and left to the newer job, which is already scheduled.
+
+    Args:
+        db: Sync database session
+        module: Module being ingested, already marked PROCESSING
+        chunks: New chunks in order
+        version: Debounce version this job is processing
+        skipped: Chunks already dropped upstream (fan-out subtasks)
+        final_attempt: False if an EmbeddingError will be retried
 
-    vector_store.add_documents(chunk_records)
+    Returns:
+        Task result dict
+    """
+    module_id = str(module.id)
+    try:
+        stats = sync_module_chunks(
+            db,
+            module,
+            chunks,
+            embed_fn=_module_embed_fn(skipped),
+            should_abort=lambda: is_stale(module_id, version),
+        )
+        module.processing_status = ProcessingStatus.COMPLETED
+        db.commit()
+    except IngestionAborted:
+        db.rollback()
+        print(f"Module {module_id}: edited during processing, aborting")
+        return {"module_id": module_id, "stale": True}
+    except Exception as e:
+        _record_failure(db, module, e, final_attempt)
+        raise
+
+    stats["skipped"] += skipped
+    print(
+        f"Module {module.id}: kept {stats['kept']}, inserted {stats['inserted']}, "
+        f"skipped {stats['skipped']}, deleted {stats['deleted']} chunks"
+    )
 
     return {
         "module_id": str(module.id),
-        "chunks_created": len(chunk_records),
-        "total_tokens": sum(chunk.metadata["token_count"] for chunk in chunks),
+        "chunks_created": stats["inserted"],
+        "chunks_kept": stats["kept"],
+        "chunks_skipped": stats["skipped"],
+        "chunks_deleted": stats["deleted"],
+        "total_tokens": stats["total_tokens"],
+    }
+
+
+def _record_failure(
+    db, module: KnowledgeModule, error: Exception, final_attempt: bool
+) -> None:
+    """
+    Roll back and mark the module FAILED, unless the error is an
+    EmbeddingError the task will retry (the module then stays PROCESSING).
+    """
+    db.rollback()
+    if final_attempt or not isinstance(error, EmbeddingError):
+        module.processing_status = ProcessingStatus.FAILED
+        db.commit()
+
+
+def _fan_out_pdf(
+    module: KnowledgeModule, page_count: int, version: Optional[int]
+) -> dict:
+    """
+    Ingest a large PDF as a chord of page-range subtasks.
+
+    Each subtask extracts, chunks and embeds its pages in parallel on the
+    worker pool, leaving the embeddings in the document embedding cache and
+    its chunks in S3 staging; the callback then writes all chunks (now cache
+    hits) in one transaction and sets the final processing_status. Chunk
+    overlap does not span range boundaries.
+    """
+    module_id = str(module.id)
+    step = settings.INGESTION_FANOUT_PAGES_PER_TASK
+    # The last range runs to the end of the document, whatever /Count said
+    ranges = [
+        (start, start + step if start + step < page_count else None)
+        for start in range(0, page_count, step)
+    ]
+    prefix = new_staging_prefix(module.file_storage_key)
+
+    header = [
+        embed_document_pages.s(module_id, module.file_storage_key, start, end, prefix)
+        for start, end in ranges
+    ]
+    # Lets the callback cache the extracted pages against this upload version
+    etag = get_s3_client().get_etag(module.file_storage_key)
+    callback = finalize_knowledge_module.s(module_id, version, etag, prefix).on_error(
+        mark_knowledge_module_failed.s(module_id, prefix)
+    )
+    result = chord(header)(callback)
+
+    print(f"Module {module_id}: {page_count} pages fanned out to {len(ranges)} tasks")
+    return {"module_id": module_id, "subtasks": len(ranges), "chord_id": result.id}
+
+
+@celery_app.task(
+    name="tasks.embed_document_pages",
+    bind=True,
+    autoretry_for=(EmbeddingError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def embed_document_pages(
+    self,
+    module_id: str,
+    file_storage_key: str,
+    start: int,
+    end: Optional[int],
+    staging_prefix: str,
+):
+    """
+    Fan-out subtask: chunk and embed pages [start, end) of a PDF (end None
+    for the rest of the document).
+
+    Embeddings are stored in the document embedding cache, and the chunks
+    that embedded and the extracted pages in S3 staging, so chord results
+    carry only keys and counts.
+
+    Returns:
+        Dict with 'chunks_key' (staged chunks, in page order), 'pages_key'
+        (staged pages, a part of the extracted-text artifact), 'chunks' and
+        'skipped'
+    """
+    s3_client = get_s3_client()
+    pages = list(iter_pdf_pages(file_storage_key, start, end))
+    pages_key = staged_pages_key(staging_prefix, start)
+    write_staged_pages(s3_client, pages_key, pages)
+
+    chunks = list(text_processor.iter_chunks(page.page_content for page in pages))
+    del pages
+    embeddings = get_embedding_tools().embed_documents_cached(
+        [chunk.page_content for chunk in chunks]
+    )
+
+    key = staged_chunks_key(staging_prefix, start)
+    staged = write_staged_chunks(
+        s3_client,
+        key,
+        (
+            chunk
+            for chunk, embedding in zip(chunks, embeddings)
+            if embedding is not None
+        ),
+    )
+    return {
+        "chunks_key": key,
+        "pages_key": pages_key,
+        "chunks": staged,
+        "skipped": len(chunks) - staged,
     }
+
+
+@celery_app.task(name="tasks.finalize_knowledge_module", base=DatabaseTask, bind=True)
+def finalize_knowledge_module(
+    self,
+    results: List[dict],
+    module_id: str,
+    version: Optional[int] = None,
+    etag: Optional[str] = None,
+    staging_prefix: Optional[str] = None,
+):
+    """Fan-in callback: write the chunks from every page-range subtask."""
+    s3_client = get_s3_client()
+    try:
+        return _finalize(self.session, s3_client, results, module_id, version, etag)
+    finally:
+        if staging_prefix:
+            delete_staging(s3_client, staging_prefix)
+
+
+def _finalize(
+    db,
+    s3_client,
+    results: List[dict],
+    module_id: str,
+    version: Optional[int],
+    etag: Optional[str],
+) -> dict:
+    """finalize_knowledge_module, before the staged output is deleted."""
+    if is_stale(module_id, version):
+        return {"module_id": module_id, "stale": True}
+
+    module = (
+        db.query(KnowledgeModule).filter(KnowledgeModule.id == UUID(module_id)).first()
+    )
+    if not module:
+        return {"error": "Module not found"}
+
+    # Chord results arrive in header order, i.e. page order
+    chunks = read_staged_chunks(s3_client, [result["chunks_key"] for result in results])
+    skipped = sum(result["skipped"] for result in results)
+
+    # Record the extracted pages so re-processing skips parsing entirely
+    store_text_artifact(
+        s3_client,
+        module.file_storage_key,
+        etag,
+        [result["pages_key"] for result in results],
+    )
+
+    return _sync_chunks(db, module, chunks, version, skipped=skipped)
+
+
+@celery_app.task(name="tasks.mark_knowledge_module_failed")
+def mark_knowledge_module_failed(
+    request, exc, traceback, module_id: str, staging_prefix: Optional[str] = None
+):
+    """Chord errback: a page-range subtask failed for good."""
+    print(f"Ingestion of module {module_id} failed in task {request.id}: {exc}")
+    with SessionLocal() as db:
+        db.query(KnowledgeModule).filter(KnowledgeModule.id == UUID(module_id)).update(
+            {KnowledgeModule.processing_status: ProcessingStatus.FAILED}
+        )
+        db.commit()
+    if staging_prefix:
+        delete_staging(get_s3_client(), staging_prefix)
+
+
+@celery_app.task(name="tasks.refresh_url_sources")
+def refresh_url_sources() -> int:
+    """
+    Periodic (celery beat): re-crawl url_source modules scraped too long ago.
+
+    Returns:
+        Number of modules queued
+    """
+    cutoff = datetime.now() - timedelta(hours=settings.WEB_REFRESH_INTERVAL_HOURS)
+    with SessionLocal() as db:
+        # Only the timestamp, not the stored page texts
+        rows = (
+            db.query(KnowledgeModule.id, KnowledgeModule.content["last_scraped"].astext)
+            .filter(
+                KnowledgeModule.module_type == "url_source",
+                KnowledgeModule.is_active.is_(True),
+            )
+            .all()
+        )
+
+    queued = 0
+    for module_id, last_scraped in rows:
+        try:
+            due = last_scraped is None or datetime.fromisoformat(last_scraped) < cutoff
+        except ValueError:
+            due = True
+        if due:
+            enqueue_knowledge_module(module_id, "url_source")
+            queued += 1
+
+    print(f"Queued {queued} url_source modules for refresh")
+    return queued
+
+
+@celery_app.task(name="tasks.reconcile_document_blobs")
+def reconcile_document_blob_refs() -> dict:
+    """
+    Periodic (celery beat): fix shared upload reference counts, deleting
+    uploads no module points at any more.
+    """
+    with SessionLocal() as db:
+        corrected, deleted, objects = reconcile_document_blobs(db, get_s3_client())
+
+    print(
+        f"Document blobs: {corrected} counts corrected, {deleted} deleted, "
+        f"{objects} untracked objects deleted"
+    )
+    return {"corrected": corrected, "deleted": deleted, "objects_deleted": objects}
+
+
+@celery_app.task(name="tasks.queue_probe")
+def queue_probe(sent_at: float) -> float:
+    """No-op task returning how long it waited in its queue (seconds)."""
+    return time.time() - sent_at
@@ -0,0 +1,147 @@
+"""
+Celery worker bootstrap: load the embedding model once, before forking.
+
+The prefork parent loads the model and then freezes the garbage collector,
+moving every object allocated so far into a permanent generation that
+collections never touch. Pool children forked afterwards (including the ones
+recycled by worker_max_tasks_per_child) share the weights copy-on-write
+instead of each holding, or reloading, a private copy.
+
+No inference runs in the parent: torch creates its OpenMP thread pool on the
+first forward pass, and a pool created before fork does not survive into the
+children. Each child instead sizes torch's thread pool to its share of the
+CPUs, so concurrent children do not oversubscribe the machine; so does
+each child's PDF extraction pool.
+
+Every child logs its RSS/PSS and how long it took from fork to ready, and
+logs memory again on exit, to confirm the sharing.
+"""
+
+import gc
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pool size seen by the parent; inherited by the children through fork
+_pool_size = 1
+
+
+def memory_usage() -> Dict[str, Optional[int]]:
+    """
+    RSS and PSS of this process in kB (Linux; None elsewhere).
+
+    PSS charges shared pages proportionally to every process mapping them,
+    so the sum of children's PSS is their real footprint.
+    """
+    usage: Dict[str, Optional[int]] = {"rss_kb": None, "pss_kb": None}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    usage[f"{name.lower()}_kb"] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def seconds_since_start() -> Optional[float]:
+    """Seconds since this process was created (i.e. forked), from /proc."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, in clock ticks since boot); skip past the
+            # parenthesised command name, which may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _should_preload() -> bool:
+    # A shared embedding server means no weights in this process at all, and
+    # ONNX Runtime starts its thread pool when the session is created, which
+    # cannot be carried across fork
+    return (
+        settings.CELERY_WORKER_PRELOAD_MODEL
+        and not settings.EMBEDDING_SERVICE_URL
+        and settings.EMBEDDING_BACKEND == "torch"
+    )
+
+
+@worker_init.connect
+def preload_in_parent(sender=None, **kwargs) -> None:
+    """Prefork parent: load the model, then freeze everything for sharing."""
+    global _pool_size
+    _pool_size = max(1, getattr(sender, "concurrency", None) or 1)
+
+    if not _should_preload():
+        return
+
+    started = time.perf_counter()
+    # The only load before fork: task modules get the model lazily
+    from app.services.embeddings.tools import get_embedding_tools
+
+    get_embedding_tools()
+
+    gc.collect()
+    gc.freeze()
+    usage = memory_usage()
+    logger.info(
+        f"Worker parent preloaded embedding model in "
+        f"{time.perf_counter() - started:.1f}s "
+        f"(rss={usage['rss_kb']} kB, frozen objects={gc.get_freeze_count()}, "
+        f"pool={_pool_size})"
+    )
+
+
+@worker_process_init.connect
+def init_child(**kwargs) -> None:
+    """Pool child: size torch threads to the pool and report boot cost."""
+    if settings.EMBEDDING_BACKEND == "torch" and not settings.EMBEDDING_SERVICE_URL:
+        import torch
+
+        threads = settings.CELERY_WORKER_TORCH_THREADS or max(
+            1, (os.cpu_count() or 1) // _pool_size
+        )
+        torch.set_num_threads(threads)
+    else:
+        threads = None
+
+    # PDF extraction pools get the same share of the CPUs
+    from app.services.ingestion.document_parser import configure_pdf_pool
+
+    configure_pdf_pool(_pool_size)
+
+    usage = memory_usage()
+    boot = seconds_since_start()
+    boot_text = f"{boot:.2f}s" if boot is not None else "unknown time"
+    logger.info(
+        f"Worker child {os.getpid()} ready in {boot_text} "
+        f"(rss={usage['rss_kb']} kB, pss={usage['pss_kb']} kB, "
+        f"torch threads={threads})"
+    )
+
+
+@worker_process_shutdown.connect
+def report_child_exit(pid=None, exitcode=None, **kwargs) -> None:
+    """Pool child exit (e.g. recycled): report its final memory footprint."""
+    # billiard children leave with os._exit, skipping the atexit hook that
+    # would stop the extraction pool's processes
+    from app.services.ingestion.document_parser import shutdown_pdf_pool
+
+    shutdown_pdf_pool()
+
+    usage = memory_usage()
+    logger.info(
+        f"Worker child {pid or os.getpid()} exiting "
+        f"(rss={usage['rss_kb']} kB, pss={usage['pss_kb']} kB)"
+    )
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Embedding backend parity check and speed benchmark.
+
+Compares the ONNX Runtime backend (int8 by default) against the fp32
+sentence-transformers model on the same texts:
+- Parity: cosine similarity between the two embeddings of every text
+- Speed: single-query latency and batch throughput for both backends
+
+Exits non-zero when the minimum cosine agreement is below --min-cosine, so it
+can gate switching EMBEDDING_BACKEND=onnx on a given node.
+
+Usage:
+    python scripts/benchmark_embeddings.py [--texts-file corpus.txt] [--fp32-onnx]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from app.core.config import settings
+from app.services.embeddings.onnx_backend import OnnxEmbeddings
+
+SAMPLE_TEXTS = [
+    "Hi! What do you do for a living?",
+    "What programming languages are you most comfortable with?",
+    "Q: Are you open to freelance work?\nA: Yes, for short backend and data "
+    "engineering projects, usually two to six weeks long.",
+    "I led the migration of a monolithic billing system to event-driven "
+    "services, cutting invoice generation time from hours to minutes while "
+    "keeping the ledger strictly consistent across regions.",
+    "Experience: Senior Software Engineer, 2019-2024. Built ingestion "
+    "pipelines processing 40M events/day; mentored five engineers; owned "
+    "on-call for the payments platform.",
+    "Services offered: architecture reviews, performance audits, Postgres "
+    "tuning, and hands-on implementation of retrieval-augmented chat systems.",
+]
+
+
+def load_texts(path: str | None, repeat: int) -> list[str]:
+    if path:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+        texts = [line for line in lines if line.strip()]
+    else:
+        texts = list(SAMPLE_TEXTS)
+    return texts * repeat
+
+
+def cosine_agreement(a: list[list[float]], b: list[list[float]]) -> np.ndarray:
+    x = np.asarray(a, dtype=np.float32)
+    y = np.asarray(b, dtype=np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    y /= np.linalg.norm(y, axis=1, keepdims=True)
+    return (x * y).sum(axis=1)
+
+
+def time_queries(model, texts: list[str], rounds: int) -> list[float]:
+    latencies = []
+    for _ in range(rounds):
+        for text in texts:
+            start = time.perf_counter()
+            model.embed_query(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def time_batch(model, texts: list[str]) -> float:
+    start = time.perf_counter()
+    model.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--texts-file", help="One text per line (default: samples)")
+    parser.add_argument("--repeat", type=int, default=20, help="Corpus repetitions")
+    parser.add_argument("--rounds", type=int, default=5, help="Query timing rounds")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument(
+        "--fp32-onnx", action="store_true", help="Benchmark unquantized ONNX"
+    )
+    args = parser.parse_args()
+
+    model_name = settings.EMBEDDING_MODEL
+    texts = load_texts(args.texts_file, args.repeat)
+    unique_texts = list(dict.fromkeys(texts))
+
+    print(f"Model: {model_name}")
+    print(f"Texts: {len(unique_texts)} unique, {len(texts)} in batch run\n")
+
+    reference = HuggingFaceEmbeddings(
+        model_name=model_name, model_kwargs={"device": "cpu"}
+    )
+    candidate = OnnxEmbeddings(
+        model_name=model_name,
+        quantize=not args.fp32_onnx,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+    )
+    label = "onnx-fp32" if args.fp32_onnx else "onnx-int8"
+
+    # Parity
+    agreement = cosine_agreement(
+        reference.embed_documents(unique_texts),
+        candidate.embed_documents(unique_texts),
+    )
+    print("Parity (cosine vs fp32 torch)")
+    print(f"  min:  {agreement.min():.5f}")
+    print(f"  mean: {agreement.mean():.5f}\n")
+
+    # Speed (one warm-up pass each so lazy init is not measured)
+    reference.embed_documents(unique_texts[:2])
+    candidate.embed_documents(unique_texts[:2])
+
+    print(f"{'backend':<12}{'p50 query ms':>14}{'p95 query ms':>14}{'batch/s':>12}")
+    results = {}
+    for name, model in (("torch-fp32", reference), (label, candidate)):
+        latencies = sorted(time_queries(model, unique_texts, args.rounds))
+        p50 = statistics.median(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        throughput = time_batch(model, texts)
+        results[name] = (p50, throughput)
+        print(f"{name:<12}{p50:>14.2f}{p95:>14.2f}{throughput:>12.1f}")
+
+    base_p50, base_tput = results["torch-fp32"]
+    cand_p50, cand_tput = results[label]
+    print(
+        f"\nSpeedup: {base_p50 / cand_p50:.2f}x query latency, "
+        f"{cand_tput / base_tput:.2f}x batch throughput"
+    )
+
+    if agreement.min() < args.min_cosine:
+        print(f"\n✗ Parity below {args.min_cosine}; keep EMBEDDING_BACKEND=torch")
+        return 1
+
+    print("\n✓ Parity OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
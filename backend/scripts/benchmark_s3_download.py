@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+S3 download benchmark: named temp file vs. spooled in-memory buffer.
+
+Uploads synthetic objects of a few sizes under a scratch prefix, downloads
+each one with S3Client.download_to_temp and S3Client.download_to_buffer,
+checks the bytes match, and prints the timings. Points at
+AWS_S3_INTERNAL_ENDPOINT, so it runs against any S3-compatible stand-in
+(e.g. a local MinIO) as well as real S3. Scratch objects are deleted.
+
+Usage:
+    python scripts/benchmark_s3_download.py [--sizes-mb 0.1 4 64] [--repeat 3]
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.storage import get_s3_client
+
+
+def _digest_path(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes-mb", type=float, nargs="+", default=[0.1, 4.0, 64.0]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--prefix", default="benchmarks/s3-download")
+    args = parser.parse_args()
+
+    s3_client = get_s3_client()
+    print(
+        f"spool={s3_client.spool_max_size // (1024 * 1024)} MB, "
+        f"chunk={s3_client.transfer_config.multipart_chunksize // (1024 * 1024)} MB, "
+        f"concurrency={s3_client.transfer_config.max_concurrency}"
+    )
+
+    failed = False
+    for size_mb in args.sizes_mb:
+        data = os.urandom(int(size_mb * 1024 * 1024))
+        expected = hashlib.sha256(data).hexdigest()
+        key = f"{args.prefix}/{uuid.uuid4()}.bin"
+        s3_client.upload_fileobj(io.BytesIO(data), key)
+
+        try:
+            timings = {"temp": [], "buffer": []}
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                with s3_client.download_to_temp(key) as temp_path:
+                    digest = _digest_path(temp_path)
+                timings["temp"].append(time.perf_counter() - started)
+                failed |= digest != expected
+
+                started = time.perf_counter()
+                with s3_client.download_to_buffer(key) as buffer:
+                    digest = hashlib.file_digest(buffer, "sha256").hexdigest()
+                timings["buffer"].append(time.perf_counter() - started)
+                failed |= digest != expected
+        finally:
+            s3_client.delete_file(key)
+
+        temp = statistics.median(timings["temp"])
+        buffer = statistics.median(timings["buffer"])
+        print(
+            f"{size_mb:>8.1f} MB  temp {temp * 1000:8.1f} ms  "
+            f"buffer {buffer * 1000:8.1f} ms  ({temp / buffer:.2f}x)"
+        )
+
+    if failed:
+        print("Downloaded bytes did not match the uploaded object")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Queue latency check for the fast/bulk Celery split.
+
+Sends no-op probe tasks to a queue and measures how long each waited before a
+worker picked it up. Run it while bulk ingestion is in progress (or pass
+--bulk-module to re-queue some large modules first) to confirm small jobs are
+not stuck behind large ones.
+
+Exits non-zero when the p95 wait exceeds --max-latency.
+
+Usage:
+    python scripts/check_queue_latency.py [--queue fast] [--bulk-module <id> ...]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.tasks.celery_config import BULK_QUEUE, FAST_QUEUE, celery_app
+
+
+def send_probe(queue: str, timeout: float) -> float:
+    result = celery_app.send_task("tasks.queue_probe", args=[time.time()], queue=queue)
+    return result.get(timeout=timeout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queue", default=FAST_QUEUE, choices=[FAST_QUEUE, BULK_QUEUE])
+    parser.add_argument("--probes", type=int, default=20)
+    parser.add_argument(
+        "--interval", type=float, default=0.2, help="Seconds between probes"
+    )
+    parser.add_argument("--max-latency", type=float, default=1.0, help="p95 limit (s)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--bulk-module",
+        action="append",
+        default=[],
+        help="Module id to (re)process on the bulk queue first; repeatable",
+    )
+    args = parser.parse_args()
+
+    for module_id in args.bulk_module:
+        celery_app.send_task(
+            "tasks.process_knowledge_module", args=[module_id], queue=BULK_QUEUE
+        )
+    if args.bulk_module:
+        print(f"Queued {len(args.bulk_module)} bulk jobs")
+
+    latencies = []
+    for _ in range(args.probes):
+        latencies.append(send_probe(args.queue, args.timeout))
+        time.sleep(args.interval)
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(f"Queue '{args.queue}': {len(latencies)} probes")
+    print(f"  p50: {p50 * 1000:.1f} ms")
+    print(f"  p95: {p95 * 1000:.1f} ms")
+    print(f"  max: {latencies[-1] * 1000:.1f} ms")
+
+    if p95 > args.max_latency:
+        print(f"\n✗ p95 queue wait above {args.max_latency}s")
+        return 1
+
+    print("\n✓ Queue latency OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""
+Check the url_source crawler against a local fixture site.
+
+Serves a small site from a thread (robots.txt with a disallowed path, pages
+with ETag and Last-Modified validators, an off-site link, slow responses) and
+crawls it twice with WebCrawler, checking robots handling, same-site link
+following, the page budget, per-host concurrency, and that the second crawl
+is answered with 304s while keeping the links of unchanged pages.
+
+Exits non-zero if any check fails.
+
+Usage:
+    python scripts/check_web_crawler.py
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.ingestion.web_crawler import WebCrawler
+
+LAST_MODIFIED = "Wed, 14 Oct 2026 08:00:00 GMT"
+
+PAGES = {
+    "/": (
+        "<html><head><title>Home</title></head><body>Home page"
+        '<a href="/a">A</a> <a href="/b#section">B</a> <a href="/c">C</a>'
+        '<a href="/private/secret">Secret</a>'
+        '<a href="http://offsite.invalid/">Elsewhere</a></body></html>'
+    ),
+    "/a": '<html><body>Page A <a href="/">Home</a></body></html>',
+    "/b": '<html><body>Page B <a href="/d">D</a></body></html>',
+    "/c": "<html><body>Page C</body></html>",
+    "/d": "<html><body>Page D</body></html>",
+    "/private/secret": "<html><body>Secret</body></html>",
+}
+ROBOTS = "User-agent: *\nDisallow: /private\n"
+
+
+class FixtureState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+
+state = FixtureState()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with state.lock:
+            state.requests.append(self.path)
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            # Slow enough for concurrent requests to overlap
+            time.sleep(0.05)
+            if self.path == "/robots.txt":
+                self._send(200, ROBOTS.encode(), {"Content-Type": "text/plain"})
+                return
+
+            page = PAGES.get(self.path)
+            if page is None:
+                self._send(404)
+                return
+
+            etag = f'"{hash(page) & 0xFFFFFFFF:x}"'
+            # /c only has Last-Modified, the rest only an ETag
+            if self.path == "/c":
+                validators = {"Last-Modified": LAST_MODIFIED}
+                not_modified = self.headers.get("If-Modified-Since") == LAST_MODIFIED
+            else:
+                validators = {"ETag": etag}
+                not_modified = self.headers.get("If-None-Match") == etag
+
+            if not_modified:
+                self._send(304, headers=validators)
+                return
+            self._send(
+                200,
+                page.encode(),
+                {"Content-Type": "text/html; charset=utf-8", **validators},
+            )
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+
+async def run_checks(base: str) -> list:
+    failures = []
+
+    def check(condition: bool, message: str):
+        print(f"{'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    per_host = 2
+    async with WebCrawler(per_host_concurrency=per_host, timeout=5.0) as crawler:
+        pages = await crawler.crawl(f"{base}/", max_pages=10, follow_links=True)
+
+    by_path = {page.url[len(base) :]: page for page in pages}
+    check(
+        {path for path, page in by_path.items() if page.status == "fetched"}
+        == {"/", "/a", "/b", "/c", "/d"},
+        "first crawl fetches every same-site page",
+    )
+    check(
+        by_path.get("/private/secret") is not None
+        and by_path["/private/secret"].status == "blocked",
+        "robots.txt disallowed page is blocked",
+    )
+    check("/private/secret" not in state.requests, "blocked page is never requested")
+    check(
+        not any("offsite" in page.url for page in pages), "off-site links not followed"
+    )
+    check(state.requests.count("/robots.txt") == 1, "robots.txt fetched once")
+    check(
+        state.max_in_flight <= per_host,
+        f"at most {per_host} concurrent requests (saw {state.max_in_flight})",
+    )
+
+    previous = {
+        page.url: {
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "links": page.links,
+        }
+        for page in pages
+        if page.status == "fetched"
+    }
+    async with WebCrawler(per_host_concurrency=per_host, timeout=5.0) as crawler:
+        again = await crawler.crawl(
+            f"{base}/", max_pages=10, follow_links=True, previous=previous
+        )
+    statuses = {page.url[len(base) :]: page.status for page in again}
+    check(
+        all(statuses.get(path) == "not_modified" for path in ("/", "/a", "/b", "/d")),
+        "second crawl gets 304 for ETag pages",
+    )
+    check(statuses.get("/c") == "not_modified", "second crawl gets 304 for /c")
+    check(
+        "/d" in statuses,
+        "links of unchanged pages are still followed (page D reached)",
+    )
+
+    async with WebCrawler(timeout=5.0) as crawler:
+        budget = await crawler.crawl(f"{base}/", max_pages=3, follow_links=True)
+    check(len(budget) == 3, "page budget is respected")
+
+    return failures
+
+
+def main() -> int:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        failures = asyncio.run(run_checks(base))
+    finally:
+        server.shutdown()
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        return 1
+    print("All crawler checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
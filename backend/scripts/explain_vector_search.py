@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+EXPLAIN the two-phase vector search candidate query across personas.
+
+For the largest and smallest personas (by embedded chunk count) runs
+EXPLAIN ANALYZE on the phase-one candidate query, once with iterative HNSW
+scans off and once with VECTOR_SEARCH_ITERATIVE_SCAN, and reports whether
+the HNSW index was used, the execution time, and how many candidates came
+back out of the requested candidate_k. On a multi-persona dataset a small
+persona typically gets far fewer than candidate_k rows with scans off,
+since the persona filter runs after the index scan.
+
+Iterative scans need pgvector >= 0.8.
+
+Exits non-zero if any persona gets fewer candidates than min(its chunk count,
+candidate_k) with the configured settings.
+
+Usage:
+    python scripts/explain_vector_search.py [--query "..."] [--personas 3]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.embeddings.tools import get_embedding_tools
+from app.services.rag.vector_search import CANDIDATE_SQL, vector_search_service
+
+PERSONA_SIZES_SQL = text(
+    """
+    SELECT km.persona_id, count(*) AS chunks
+    FROM knowledge_chunks kc
+    JOIN knowledge_modules km ON kc.module_id = km.id
+    WHERE km.is_active = true AND kc.embedding IS NOT NULL
+    GROUP BY km.persona_id
+    ORDER BY chunks DESC
+"""
+)
+
+
+def walk_plan(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+async def explain(db, params: dict, iterative: bool) -> tuple[bool, float, int]:
+    """
+    Run EXPLAIN ANALYZE on the candidate query in its own transaction.
+
+    Returns:
+        (HNSW index used, execution ms, rows returned)
+    """
+    async with db.begin():
+        await vector_search_service._set_ef_search(
+            db, max(settings.VECTOR_SEARCH_EF_SEARCH, params["candidate_k"])
+        )
+        if iterative:
+            await vector_search_service._set_iterative_scan(db)
+        else:
+            await db.execute(text("SET LOCAL hnsw.iterative_scan = off"))
+
+        result = await db.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {CANDIDATE_SQL.text}"),
+            params,
+        )
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = plan[0]
+
+    nodes = list(walk_plan(plan["Plan"]))
+    uses_hnsw = any(
+        "hnsw" in node.get("Index Name", "")
+        for node in nodes
+        if node["Node Type"].startswith("Index")
+    )
+    return uses_hnsw, plan["Execution Time"], plan["Plan"]["Actual Rows"]
+
+
+async def run(query: str, top_k: int, persona_count: int) -> int:
+    candidate_k = vector_search_service._candidate_k(top_k)
+    query_embedding = await get_embedding_tools().aembed_query(query)
+
+    async with AsyncSessionLocal() as db:
+        sizes = (await db.execute(PERSONA_SIZES_SQL)).fetchall()
+        await db.rollback()
+        if len(sizes) < 2:
+            print("Need at least two personas with embedded chunks")
+            return 1
+
+        picked = sizes[:persona_count] + sizes[-persona_count:]
+        picked = list(dict.fromkeys(picked))
+
+        print(
+            f"candidate_k={candidate_k} ef_search={settings.VECTOR_SEARCH_EF_SEARCH} "
+            f"iterative_scan={settings.VECTOR_SEARCH_ITERATIVE_SCAN} "
+            f"max_scan_tuples={settings.VECTOR_SEARCH_MAX_SCAN_TUPLES}\n"
+        )
+        print(
+            f"{'persona':<38}{'chunks':>8}{'scan':>16}{'hnsw':>6}{'ms':>9}{'rows':>6}"
+        )
+
+        short = 0
+        for persona_id, chunks in picked:
+            params = {
+                "query_embedding": str(query_embedding),
+                "persona_id": str(persona_id),
+                "candidate_k": candidate_k,
+            }
+            for iterative in (False, True):
+                uses_hnsw, ms, rows = await explain(db, params, iterative)
+                label = settings.VECTOR_SEARCH_ITERATIVE_SCAN if iterative else "off"
+                print(
+                    f"{str(persona_id):<38}{chunks:>8}{label:>16}"
+                    f"{'yes' if uses_hnsw else 'no':>6}{ms:>9.2f}{rows:>6}"
+                )
+                if iterative and rows < min(chunks, candidate_k):
+                    short += 1
+
+    if short:
+        print(f"\n✗ {short} persona(s) got fewer than candidate_k candidates")
+        return 1
+
+    print("\n✓ Every persona got a full candidate set")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--query", default="What do you do for a living?")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument(
+        "--personas", type=int, default=3, help="Largest and smallest N personas"
+    )
+    args = parser.parse_args()
+    return asyncio.run(run(args.query, args.top_k, args.personas))
+
+
+if __name__ == "__main__":
+    sys.exit(main())